@@ -4,7 +4,8 @@ from sqlalchemy import text, inspect
 from datetime import datetime, timezone
 import pandas as pd
 import io
-import json
+import csv
+import orjson
 
 from database import get_db
 from services.data_ingestion import DataIngestionService
@@ -15,6 +16,33 @@ from auth import get_current_user
 
 router = APIRouter(prefix="/api/data", tags=["Data"])
 
+
+def _copy_upsert(cursor, table: str, columns: list, rows, conflict_columns: list):
+    """
+    Upsert rows into table through a COPY-loaded staging table.
+
+    Rows are streamed as CSV in one COPY (raw_data already serialized with
+    orjson), then merged with a single INSERT ... ON CONFLICT DO UPDATE.
+    """
+    staging = f"_staging_{table}"
+    column_list = ", ".join(columns)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c not in conflict_columns)
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(f"CREATE TEMP TABLE {staging} AS SELECT {column_list} FROM {table} WITH NO DATA")
+    cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+    cursor.execute(f"""
+        INSERT INTO {table} ({column_list})
+        SELECT {column_list} FROM {staging}
+        ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {updates}
+    """)
+    cursor.execute(f"DROP TABLE {staging}")
+
+
 @router.post("/upload/transactions")
 async def upload_transactions(
     file: UploadFile = File(...),
@@ -288,35 +316,24 @@ async def upload_transactions(
         unique_txns = {r['transaction_id']: r for r in valid_records}
         valid_records = list(unique_txns.values())
         
-        batch_size = 500
-        for i in range(0, len(valid_records), batch_size):
-            batch = valid_records[i:i+batch_size]
-            placeholders = []
-            values = []
-            
-            for record in batch:
-                placeholders.append("(%s, %s, %s::uuid, %s::jsonb, %s, %s)")
-                values.extend([
+        now = datetime.now(timezone.utc)
+        _copy_upsert(
+            cursor,
+            "transactions",
+            ["transaction_id", "customer_id", "upload_id", "raw_data", "expires_at", "created_at"],
+            (
+                (
                     record['transaction_id'],
                     record.get('customer_id'),
                     str(record['upload_id']),
-                    json.dumps(record['raw_data']),
+                    orjson.dumps(record['raw_data']).decode(),
                     record['expires_at'],
-                    record.get('created_at', datetime.now(timezone.utc))
-                ])
-            
-            sql = f"""
-                INSERT INTO transactions (transaction_id, customer_id, upload_id, raw_data, expires_at, created_at)
-                VALUES {','.join(placeholders)}
-                ON CONFLICT (transaction_id, upload_id)
-                DO UPDATE SET
-                    customer_id = EXCLUDED.customer_id,
-                    raw_data = EXCLUDED.raw_data,
-                    expires_at = EXCLUDED.expires_at,
-                    created_at = EXCLUDED.created_at
-            """
-            cursor.execute(sql, values)
-            print(f"[UPLOAD] Processed {min(i+batch_size, len(valid_records))}/{len(valid_records)} transactions")
+                    record.get('created_at', now)
+                )
+                for record in valid_records
+            ),
+            ["transaction_id", "upload_id"]
+        )
         
         cursor.close()
         print(f"[UPLOAD] Upserted {len(valid_records)} transactions")
@@ -695,33 +712,27 @@ async def upload_customers(
         connection = db.connection().connection  # Get raw psycopg2 connection
         cursor = connection.cursor()
         
-        batch_size = 500
-        for i in range(0, len(valid_records), batch_size):
-            batch = valid_records[i:i+batch_size]
-            placeholders = []
-            values = []
-            
-            for record in batch:
-                placeholders.append("(%s, %s::uuid, %s::jsonb, %s, %s)")
-                values.extend([
+        # Deduplicate (a single ON CONFLICT statement cannot touch a row twice)
+        unique_customers = {r['customer_id']: r for r in valid_records}
+        valid_records = list(unique_customers.values())
+        
+        now = datetime.now(timezone.utc)
+        _copy_upsert(
+            cursor,
+            "customers",
+            ["customer_id", "upload_id", "raw_data", "expires_at", "created_at"],
+            (
+                (
                     record['customer_id'],
                     str(record['upload_id']),
-                    json.dumps(record['raw_data']),
+                    orjson.dumps(record['raw_data']).decode(),
                     record['expires_at'],
-                    record.get('created_at', datetime.now(timezone.utc))
-                ])
-            
-            sql = f"""
-                INSERT INTO customers (customer_id, upload_id, raw_data, expires_at, created_at)
-                VALUES {','.join(placeholders)}
-                ON CONFLICT (customer_id, upload_id) 
-                DO UPDATE SET
-                    raw_data = EXCLUDED.raw_data,
-                    expires_at = EXCLUDED.expires_at,
-                    created_at = EXCLUDED.created_at
-            """
-            cursor.execute(sql, values)
-            print(f"[UPLOAD] Processed {min(i+batch_size, len(valid_records))}/{len(valid_records)} customers")
+                    record.get('created_at', now)
+                )
+                for record in valid_records
+            ),
+            ["customer_id", "upload_id"]
+        )
         
         cursor.close()
         print(f"[UPLOAD] Upserted {len(valid_records)} customers")
@@ -731,33 +742,29 @@ async def upload_customers(
             print(f"[UPLOAD] Upserting {len(extracted_accounts)} accounts...")
             cursor = db.connection().connection.cursor()
             
-            batch_size = 500
-            for i in range(0, len(extracted_accounts), batch_size):
-                batch = extracted_accounts[i:i+batch_size]
-                placeholders = []
-                values = []
-                
-                for account in batch:
-                    placeholders.append("(%s, %s, %s::uuid, %s::jsonb, %s, %s)")
-                    values.extend([
+            # Deduplicate: customers sharing an account (joint accounts) yield the
+            # same account_id, and one ON CONFLICT statement cannot touch a row twice
+            unique_accounts = {a['account_id']: a for a in extracted_accounts}
+            extracted_accounts = list(unique_accounts.values())
+            
+            now = datetime.now(timezone.utc)
+            _copy_upsert(
+                cursor,
+                "accounts",
+                ["account_id", "customer_id", "upload_id", "raw_data", "expires_at", "created_at"],
+                (
+                    (
                         account['account_id'],
                         account['customer_id'],
                         str(account['upload_id']),
-                        json.dumps(account.get('raw_data', {})),
+                        orjson.dumps(account.get('raw_data', {})).decode(),
                         account['expires_at'],
-                        account.get('created_at', datetime.now(timezone.utc))
-                    ])
-                
-                sql = f"""
-                    INSERT INTO accounts (account_id, customer_id, upload_id, raw_data, expires_at, created_at)
-                    VALUES {','.join(placeholders)}
-                    ON CONFLICT (account_id, upload_id) DO UPDATE SET
-                        customer_id = EXCLUDED.customer_id,
-                        raw_data = EXCLUDED.raw_data,
-                        expires_at = EXCLUDED.expires_at,
-                        created_at = EXCLUDED.created_at
-                """
-                cursor.execute(sql, values)
+                        account.get('created_at', now)
+                    )
+                    for account in extracted_accounts
+                ),
+                ["account_id", "upload_id"]
+            )
             
             cursor.close()
             print(f"[UPLOAD] Upserted {len(extracted_accounts)} accounts")
@@ -10,6 +10,7 @@ Validates uploaded data for quality issues before processing:
 """
 
 import pandas as pd
+import numpy as np
 from typing import Dict, List, Any
 from datetime import datetime, timezone
 import structlog
@@ -17,6 +18,36 @@ import structlog
 logger = structlog.get_logger("data_quality")
 
 
+def count_duplicates(series: pd.Series) -> int:
+    """Number of values repeating an earlier one (same as duplicated().sum())"""
+    if series.is_unique:
+        return 0
+    return series.size - series.nunique(dropna=False)
+
+
+# Bucket edges for amount_profile: [largest negative double, 0, 10M]. With
+# side='left' searchsorted returns 0 for v < 0, 1 for v == 0 (incl. -0.0),
+# 2 for 0 < v <= 10M and 3 for v > 10M or NaN (NaN sorts last).
+_AMOUNT_EDGES = np.array([np.nextafter(0.0, -np.inf), 0.0, 10_000_000.0])
+
+
+def amount_profile(amounts: np.ndarray) -> Dict[str, int]:
+    """
+    Count negative, zero, very large (> 10M) and missing amounts.
+    
+    One bucketing pass plus a bincount, instead of a separate comparison
+    pass over the column for each check.
+    """
+    buckets = np.bincount(np.searchsorted(_AMOUNT_EDGES, amounts, side='left'), minlength=4)
+    missing = int(np.count_nonzero(np.isnan(amounts)))
+    return {
+        "negative": int(buckets[0]),
+        "zero": int(buckets[1]),
+        "very_large": int(buckets[3]) - missing,
+        "missing": missing,
+    }
+
+
 class DataQualityValidator:
     """
     Validates data quality for transactions and customers.
@@ -44,8 +75,11 @@ class DataQualityValidator:
         issues = []
         warnings = []
         
+        amounts = df['transaction_amount'].to_numpy(dtype=float, na_value=np.nan)
+        amount_counts = amount_profile(amounts)
+        
         # Check for negative amounts
-        negative_amounts = (df['transaction_amount'] < 0).sum()
+        negative_amounts = amount_counts["negative"]
         if negative_amounts > 0:
             issues.append({
                 "severity": "error",
@@ -55,9 +89,12 @@ class DataQualityValidator:
             })
         
         # Check for future dates
+        # Ingestion keeps dates as the uploaded text (raw_data stores it verbatim),
+        # so parse into a local array; the caller's frame is never modified
         now = pd.Timestamp.now(tz=timezone.utc)
-        df['transaction_date'] = pd.to_datetime(df['transaction_date'], utc=True)
-        future_dates = (df['transaction_date'] > now).sum()
+        dates = pd.to_datetime(df['transaction_date'], utc=True, cache=True)
+        dates = dates.to_numpy(dtype='datetime64[ns]')  # UTC, as raw int64 ns
+        future_dates = np.count_nonzero(dates > now.tz_localize(None).to_datetime64())
         if future_dates > 0:
             warnings.append({
                 "severity": "warning",
@@ -68,7 +105,7 @@ class DataQualityValidator:
         
         # Check for duplicates
         if 'transaction_id' in df.columns:
-            dupes = df.duplicated(subset=['transaction_id']).sum()
+            dupes = count_duplicates(df['transaction_id'])
             if dupes > 0:
                 issues.append({
                     "severity": "error",
@@ -78,7 +115,7 @@ class DataQualityValidator:
                 })
         
         # Check for missing customer IDs
-        missing_customers = df['customer_id'].isna().sum()
+        missing_customers = np.count_nonzero(df['customer_id'].isna().to_numpy())
         if missing_customers > 0:
             issues.append({
                 "severity": "error",
@@ -88,7 +125,7 @@ class DataQualityValidator:
             })
         
         # Check for missing amounts
-        missing_amounts = df['transaction_amount'].isna().sum()
+        missing_amounts = amount_counts["missing"]
         if missing_amounts > 0:
             issues.append({
                 "severity": "error",
@@ -99,7 +136,7 @@ class DataQualityValidator:
         
         # Check for unreasonably large amounts (potential data entry errors)
         if 'transaction_amount' in df.columns:
-            very_large = (df['transaction_amount'] > 10_000_000).sum()  # > 10M
+            very_large = amount_counts["very_large"]  # > 10M
             if very_large > 0:
                 warnings.append({
                     "severity": "warning",
@@ -109,7 +146,7 @@ class DataQualityValidator:
                 })
         
         # Check for zero amounts
-        zero_amounts = (df['transaction_amount'] == 0).sum()
+        zero_amounts = amount_counts["zero"]
         if zero_amounts > 0:
             warnings.append({
                 "severity": "warning",
@@ -165,7 +202,7 @@ class DataQualityValidator:
         
         # Check for duplicate customer IDs
         if 'customer_id' in df.columns:
-            dupes = df.duplicated(subset=['customer_id']).sum()
+            dupes = count_duplicates(df['customer_id'])
             if dupes > 0:
                 issues.append({
                     "severity": "error",
@@ -1,9 +1,49 @@
 import pandas as pd
-from typing import List, Dict, Optional
+import numpy as np
+import re
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from models import VerifiedEntity, AlertExclusionLog
 from datetime import datetime
-import uuid
+
+def keyword_bitmask(narratives: pd.Series, keyword_groups: List[List[str]]) -> np.ndarray:
+    """
+    Scan narratives once into a uint8 mask with bit i set when any keyword of
+    keyword_groups[i] occurs (case-insensitive, max 8 groups).
+    
+    Only distinct narratives are scanned (templated bank descriptions repeat
+    heavily); each is lowercased once and each group is one literal
+    alternation, so callers combine bits instead of re-running regexes.
+    """
+    codes, uniques = pd.factorize(narratives)
+    text = pd.Series(uniques, dtype=object).astype(str).str.lower()
+    unique_bits = np.zeros(len(text), dtype=np.uint8)
+    for i, keywords in enumerate(keyword_groups):
+        hit = text.str.contains('|'.join(map(re.escape, keywords)), regex=True).to_numpy(dtype=bool)
+        unique_bits |= hit.astype(np.uint8) << np.uint8(i)
+    # Missing narratives (code -1) match nothing
+    bits = np.zeros(len(codes), dtype=np.uint8)
+    present = codes >= 0
+    bits[present] = unique_bits[codes[present]]
+    return bits
+
+def event_pattern(keyword_groups: Dict[str, List[str]]) -> "re.Pattern":
+    """
+    Compile keyword groups into one pattern over lowercased text, with a
+    named group per event.
+
+    The alternation sits in a lookahead so finditer reports every start
+    position and, at each one, the first listed group that matches there;
+    scanning once therefore finds the highest-precedence event anywhere in
+    the text.
+    """
+    groups = '|'.join(
+        f"(?P<{name}>{'|'.join(map(re.escape, keywords))})"
+        for name, keywords in keyword_groups.items()
+    )
+    return re.compile(f'(?=(?:{groups}))')
 
 class EventDetector:
     """Detects legitimate events in transactions with Context Awareness"""
@@ -17,24 +57,72 @@ class EventDetector:
     FIXED_DEPOSIT_KEYWORDS = ['fixed deposit', 'fd', 'term deposit', 'investment', 'fd maturity']
     SALARY_KEYWORDS = ['salary', 'payroll', 'wages', 'compensation', 'monthly income']
 
+    # Listed in detection precedence
+    EVENT_PRECEDENCE = ('education', 'loan', 'fixed_deposit')
+    EVENT_PATTERN = event_pattern({
+        'education': EDUCATION_KEYWORDS,
+        'loan': LOAN_KEYWORDS,
+        'fixed_deposit': FIXED_DEPOSIT_KEYWORDS,
+    })
+
     def __init__(self, db: Session):
         self.db = db
+        # entity_type -> lowercased active entity names joined by NUL;
+        # loaded on first lookup so one query serves the whole refinement pass
+        self._verified_names: Optional[Dict[str, str]] = None
+        # (lowercased name, entity_type) -> verified, memoized per detector
+        self._verified_lookups: Dict[Tuple[str, str], bool] = {}
+
+    def _load_verified_entities(self) -> Dict[str, str]:
+        if self._verified_names is None:
+            names_by_type: Dict[str, List[str]] = {}
+            rows = self.db.query(VerifiedEntity.entity_name, VerifiedEntity.entity_type).filter(
+                VerifiedEntity.is_active == True
+            ).all()
+            for entity_name, entity_type in rows:
+                if entity_name:
+                    names_by_type.setdefault(entity_type, []).append(entity_name.lower())
+            self._verified_names = {t: '\0'.join(names) for t, names in names_by_type.items()}
+        return self._verified_names
 
     def is_verified_entity(self, entity_name: str, entity_type: str) -> bool:
         """Check if entity is in verified whitelist"""
         if not entity_name:
             return False
             
-        # Basic fuzzy match or direct match
-        # In prod: use localized search or vector search
-        # Here: simple ILIKE
-        entity = self.db.query(VerifiedEntity).filter(
-            VerifiedEntity.entity_name.ilike(f"%{entity_name}%"),
-            VerifiedEntity.entity_type == entity_type,
-            VerifiedEntity.is_active == True
-        ).first()
-        
-        return entity is not None
+        # Same match as ILIKE '%name%' against the whitelist, done as a single
+        # substring scan over the preloaded names. The NUL separator keeps a
+        # match from spanning two entity names.
+        key = (str(entity_name).lower(), entity_type)
+        if key not in self._verified_lookups:
+            self._verified_lookups[key] = key[0] in self._load_verified_entities().get(entity_type, '')
+        return self._verified_lookups[key]
+
+    def is_verified_entities(self, entity_names: pd.Series, entity_type: str) -> pd.Series:
+        """Vectorized is_verified_entity: one lookup per distinct name"""
+        unique_names = entity_names.dropna().unique()
+        verified = {name: self.is_verified_entity(name, entity_type) for name in unique_names}
+        return entity_names.map(verified).fillna(False).astype(bool)
+
+    def detect_event_types(self, narratives: pd.Series) -> pd.Series:
+        """
+        Vectorized event-type step of detect_event_context.
+        Returns 'education' / 'loan' / 'fixed_deposit' (same precedence) or None per row.
+        """
+        bits = keyword_bitmask(
+            narratives, [self.EDUCATION_KEYWORDS, self.LOAN_KEYWORDS, self.FIXED_DEPOSIT_KEYWORDS]
+        )
+        conditions = [(bits & (1 << i)) != 0 for i in range(3)]
+        event_types = np.select(conditions, ['education', 'loan', 'fixed_deposit'], default=None)
+        return pd.Series(event_types, index=narratives.index, dtype=object)
+
+    @staticmethod
+    @lru_cache(maxsize=100_000)
+    def _classify_narrative(narrative: str) -> Optional[str]:
+        """Event type of a narrative, memoized since narratives repeat heavily"""
+        # One scan over the narrative for all keyword groups
+        found = {m.lastgroup for m in EventDetector.EVENT_PATTERN.finditer(narrative.lower())}
+        return next((e for e in EventDetector.EVENT_PRECEDENCE if e in found), None)
 
     def detect_event_context(self, narrative: str, amount: float, beneficiary: str) -> Optional[Dict]:
         """
@@ -44,15 +132,7 @@ class EventDetector:
         if not narrative:
             return None
         
-        narrative_lower = str(narrative).lower()
-        event_type = None
-        
-        if any(kw in narrative_lower for kw in self.EDUCATION_KEYWORDS):
-            event_type = 'education'
-        elif any(kw in narrative_lower for kw in self.LOAN_KEYWORDS):
-            event_type = 'loan'
-        elif any(kw in narrative_lower for kw in self.FIXED_DEPOSIT_KEYWORDS):
-            event_type = 'fixed_deposit'
+        event_type = self._classify_narrative(str(narrative))
             
         if not event_type:
             return None
@@ -80,58 +160,144 @@ class EventDetector:
 class SmartLayerProcessor:
     """Main smart layer orchestrator 2.0"""
     
+    # Keywords that pre-select customers for event_based rules
+    REFINEMENT_KEYWORDS = {
+        'education': ['tuition', 'university', 'college', 'school'],
+        'crypto': ['crypto', 'bitcoin', 'binance', 'coinbase'],
+        'loan': ['loan', 'mortgage', 'credit'],
+    }
+    
     def __init__(self, db: Session):
         self.db = db
         self.event_detector = EventDetector(db)
     
-    def _get_trigger_window_transactions(
+    def _match_event_exclusions(
         self,
-        alert: pd.Series,
+        candidate_alerts: pd.DataFrame,
         transactions: pd.DataFrame,
-        lookback_days: int = 30
+        event_types: pd.Series,
+        excluded_events: List[str],
+        lookback_days: int
     ) -> pd.DataFrame:
         """
-        Filter transactions to only those within the alert's trigger window.
-        Uses alert_date and lookback period to get precise window.
+        Find, for every candidate alert, the first transaction in its trigger
+        window whose detected event justifies excluding the alert.
+        
+        Same rules as the per-transaction detect_event_context check, run as
+        column operations plus one sorted window lookup. Returns a frame indexed
+        like candidate_alerts (excluded alerts only) with exclusion_reason and
+        risk_flags columns.
         """
-        customer_id = alert['customer_id']
-        alert_date = pd.to_datetime(alert.get('alert_date', datetime.utcnow()))
+        if candidate_alerts.empty:
+            return pd.DataFrame()
         
-        # Calculate trigger window
-        window_start = alert_date - pd.Timedelta(days=lookback_days)
-        window_end = alert_date
+        txns = pd.DataFrame({
+            'customer_id': transactions['customer_id'],
+            'transaction_date': pd.to_datetime(transactions['transaction_date']),
+            'event_type': event_types,
+            'amount': transactions['transaction_amount'] if 'transaction_amount' in transactions.columns else 0,
+            'beneficiary': transactions['beneficiary_name'] if 'beneficiary_name' in transactions.columns else None,
+        })
+        txns = txns[txns['event_type'].isin(excluded_events)]
+        if txns.empty:
+            return pd.DataFrame()
         
-        # Filter to customer and date range
-        trigger_txns = transactions[
-            (transactions['customer_id'] == customer_id) &
-            (pd.to_datetime(transactions['transaction_date']) >= window_start) &
-            (pd.to_datetime(transactions['transaction_date']) <= window_end)
-        ]
+        # Context checks
+        txns['is_verified'] = False
+        for event_type, entity_type in (('education', 'University'), ('loan', 'FinancialInstitution')):
+            is_event = txns['event_type'] == event_type
+            if is_event.any():
+                txns.loc[is_event, 'is_verified'] = self.event_detector.is_verified_entities(
+                    txns.loc[is_event, 'beneficiary'], entity_type
+                )
+        txns['amount_reasonable'] = ~((txns['event_type'] == 'education') & (txns['amount'] > 50000))
+        
+        # Education only counts when verified and reasonably sized; other events always do
+        qualifies = (txns['event_type'] != 'education') | (txns['is_verified'] & txns['amount_reasonable'])
+        txns = txns[qualifies]
+        if txns.empty:
+            return pd.DataFrame()
+        
+        # Restrict to each alert's trigger window. Transactions are sorted once
+        # by (customer, date) so every window is a contiguous slice found by
+        # binary search, rather than joining alerts to full customer histories
+        if 'alert_date' in candidate_alerts.columns:
+            alert_dates = pd.to_datetime(candidate_alerts['alert_date'])
+        else:
+            alert_dates = pd.Series(pd.Timestamp(datetime.utcnow()), index=candidate_alerts.index)
+        txns = txns[txns['transaction_date'].notna()]
+        if txns.empty:
+            return pd.DataFrame()
         
-        return trigger_txns
+        txn_codes, customers = pd.factorize(txns['customer_id'])
+        alert_codes = customers.get_indexer(candidate_alerts['customer_id'])
+        window_end = alert_dates.to_numpy(dtype='datetime64[ns]')
+        window_start = window_end - np.timedelta64(lookback_days, 'D')
+        
+        # Dense-rank all timestamps so (customer, date) packs into one int64 key
+        txn_times = txns['transaction_date'].to_numpy(dtype='datetime64[ns]')
+        _, ranks = np.unique(np.concatenate([txn_times, window_start, window_end]), return_inverse=True)
+        stride = len(ranks) + 1
+        n_txns, n_alerts = len(txns), len(candidate_alerts)
+        txn_keys = txn_codes.astype(np.int64) * stride + ranks[:n_txns]
+        start_keys = alert_codes.astype(np.int64) * stride + ranks[n_txns:n_txns + n_alerts]
+        end_keys = alert_codes.astype(np.int64) * stride + ranks[n_txns + n_alerts:]
+        
+        order = np.argsort(txn_keys, kind='stable')
+        sorted_keys = txn_keys[order]
+        lo = np.searchsorted(sorted_keys, start_keys, side='left')
+        hi = np.searchsorted(sorted_keys, end_keys, side='right')
+        valid = (alert_codes >= 0) & ~np.isnat(window_end)
+        counts = np.where(valid, np.maximum(hi - lo, 0), 0)
+        total = int(counts.sum())
+        if total == 0:
+            return pd.DataFrame()
+        
+        # Expand each window slice and keep its earliest transaction (rows of
+        # txns are still in original order, so the smallest position wins)
+        offsets = np.cumsum(counts) - counts
+        slice_pos = np.repeat(lo, counts) + (np.arange(total) - np.repeat(offsets, counts))
+        has_match = counts > 0
+        first_pos = np.minimum.reduceat(order[slice_pos], offsets[has_match])
+        
+        first = txns.iloc[first_pos].set_axis(candidate_alerts.index[has_match])
+        
+        is_education = first['event_type'] == 'education'
+        reasons = np.where(
+            is_education,
+            'Verified ' + first['event_type'] + ' transaction to ' + first['beneficiary'].astype(str),
+            'Legitimate ' + first['event_type'] + ' transaction'
+        )
+        risk_flags = [
+            {
+                'event_type': event_type,
+                'is_verified': bool(is_verified),
+                'amount_reasonable': bool(amount_reasonable),
+                'beneficiary': beneficiary,
+                'amount': float(amount)
+            }
+            for event_type, is_verified, amount_reasonable, beneficiary, amount in zip(
+                first['event_type'], first['is_verified'], first['amount_reasonable'],
+                first['beneficiary'], first['amount']
+            )
+        ]
+        return pd.DataFrame(
+            {'exclusion_reason': reasons, 'risk_flags': risk_flags},
+            index=first.index
+        )
     
-    def _write_exclusion_log(
-        self,
-        alert_id: str,
-        rule_id: str,
-        exclusion_reason: str,
-        risk_flags: Dict
-    ):
-        """Write AlertExclusionLog entry when excluding an alert"""
+    def _write_exclusion_logs(self, log_entries: List[Dict]):
+        """Write AlertExclusionLog entries for excluded alerts in one bulk insert"""
+        if not log_entries:
+            return
         try:
-            log_entry = AlertExclusionLog(
-                log_id=str(uuid.uuid4()),
-                alert_id=alert_id,
-                exclusion_timestamp=datetime.utcnow(),
-                rule_id=rule_id,
-                exclusion_reason=exclusion_reason,
-                risk_flags=risk_flags  # Compact snapshot of risk indicators
-            )
-            self.db.add(log_entry)
+            # Entries carry alert_id, rule_id, exclusion_reason and risk_flags;
+            # log_id and exclusion_timestamp come from their server defaults
+            self.db.execute(insert(AlertExclusionLog), log_entries)
             self.db.commit()
         except Exception as e:
             self.db.rollback()
-            print(f"Failed to write exclusion log: {e}")
+            print(f"Failed to write exclusion logs: {e}")
     
     def apply_refinements(
         self,
@@ -150,6 +316,14 @@ class SmartLayerProcessor:
         if 'exclusion_reason' not in alerts.columns:
             alerts['exclusion_reason'] = None
         
+        # Narratives are scanned once per call and shared by every rule
+        event_names = list(self.REFINEMENT_KEYWORDS)
+        narrative_bits = None
+        event_types = None
+        
+        # Exclusion logs are collected across rules and written once at the end
+        exclusion_logs = []
+        
         # VECTORIZED APPROACH: Process all alerts at once instead of iterrows
         for rule in refinement_rules:
             rule_id = rule.get('rule_id', 'unknown')
@@ -157,106 +331,63 @@ class SmartLayerProcessor:
             if rule['type'] == 'event_based':
                 excluded_events = rule.get('excluded_events', [])
                 
-                # Build keyword pattern for all excluded events
-                event_keywords = {
-                    'education': ['tuition', 'university', 'college', 'school'],
-                    'crypto': ['crypto', 'bitcoin', 'binance', 'coinbase'],
-                    'loan': ['loan', 'mortgage', 'credit'],
-                }
-                
-                # Combine all keywords for excluded events
-                all_keywords = []
-                for event in excluded_events:
-                    all_keywords.extend(event_keywords.get(event, []))
+                # Keyword groups for all excluded events, as bits of narrative_bits
+                rule_bits = 0
+                for i, event in enumerate(event_names):
+                    if event in excluded_events:
+                        rule_bits |= 1 << i
                 
-                if not all_keywords:
+                if not rule_bits:
                     continue
                 
-                # Vectorized: Find all transactions matching keywords
-                # Optimization: Pre-compile regex
-                import re
-                keyword_pattern = '|'.join(map(re.escape, all_keywords)) # Escape to prevent regex injection errors
-                compiled_regex = re.compile(keyword_pattern, re.IGNORECASE)
-                
-                matching_txns = transactions[
-                    transactions['transaction_narrative'].str.contains(
-                        compiled_regex, 
-                        na=False,
-                        regex=True
+                if narrative_bits is None:
+                    narratives = transactions['transaction_narrative']
+                    narrative_bits = keyword_bitmask(
+                        narratives, [self.REFINEMENT_KEYWORDS[event] for event in event_names]
                     )
-                ].copy()
+                    event_types = self.event_detector.detect_event_types(narratives)
+                    # Encode customer_id on both frames against one shared set of
+                    # codes so per-rule membership tests compare ints, not strings
+                    txn_customer_codes, customer_index = pd.factorize(transactions['customer_id'])
+                    alert_customer_codes = customer_index.get_indexer(alerts['customer_id'])
                 
-                if matching_txns.empty:
+                # Vectorized: Find all transactions matching keywords
+                matching = (narrative_bits & rule_bits) != 0
+                if not matching.any():
                     continue
                 
-                # Vectorized: Get customer IDs with matching transactions
-                customers_with_matches = set(matching_txns['customer_id'].unique())
+                # Vectorized: Get customer codes with matching transactions
+                customers_with_matches = np.unique(txn_customer_codes[matching])
+                customers_with_matches = customers_with_matches[customers_with_matches >= 0]
                 
                 # Vectorized: Mark alerts for these customers (not yet excluded)
                 mask = (
-                    alerts['customer_id'].isin(customers_with_matches) &
+                    np.isin(alert_customer_codes, customers_with_matches) &
                     (~alerts['excluded'])
                 )
                 
-                # For alerts that match, we need to verify context
-                # This part still needs row-level logic but only for matched subset
-                matched_alerts = alerts[mask].copy()
+                matches = self._match_event_exclusions(
+                    alerts[mask], transactions, event_types, excluded_events, lookback_days
+                )
+                if matches.empty:
+                    continue
                 
-                for idx in matched_alerts.index:
-                    alert = alerts.loc[idx]
-                    
-                    # Get trigger window transactions
-                    trigger_txns = self._get_trigger_window_transactions(
-                        alert, 
-                        transactions, 
-                        lookback_days
-                    )
-                    
-                    should_exclude = False
-                    exclusion_reason = None
-                    risk_flags = {}
-                    
-                    # Check transactions in trigger window
-                    for _, txn in trigger_txns.iterrows():
-                        narrative = txn.get('transaction_narrative')
-                        amount = txn.get('transaction_amount', 0)
-                        beneficiary = txn.get('beneficiary_name')
-                        
-                        context = self.event_detector.detect_event_context(narrative, amount, beneficiary)
-                        
-                        if context and context['type'] in excluded_events:
-                            # Build risk flags snapshot
-                            risk_flags = {
-                                'event_type': context['type'],
-                                'is_verified': context['is_verified'],
-                                'amount_reasonable': context['amount_reasonable'],
-                                'beneficiary': beneficiary,
-                                'amount': float(amount)
-                            }
-                            
-                            if context['type'] == 'education':
-                                if context['is_verified'] and context['amount_reasonable']:
-                                    should_exclude = True
-                                    exclusion_reason = f"Verified {context['type']} transaction to {beneficiary}"
-                            else:
-                                should_exclude = True
-                                exclusion_reason = f"Legitimate {context['type']} transaction"
-                            
-                            if should_exclude:
-                                break
-                    
-                    if should_exclude:
-                        alerts.at[idx, 'excluded'] = True
-                        alerts.at[idx, 'exclusion_reason'] = exclusion_reason
-                        
-                        # Write exclusion log
-                        alert_id = alert.get('alert_id')
+                alerts.loc[matches.index, 'excluded'] = True
+                alerts.loc[matches.index, 'exclusion_reason'] = matches['exclusion_reason']
+                
+                # Queue exclusion log entries
+                if 'alert_id' in alerts.columns:
+                    for alert_id, reason, risk_flags in zip(
+                        alerts.loc[matches.index, 'alert_id'], matches['exclusion_reason'], matches['risk_flags']
+                    ):
                         if alert_id:
-                            self._write_exclusion_log(
-                                alert_id=alert_id,
-                                rule_id=rule_id,
-                                exclusion_reason=exclusion_reason,
-                                risk_flags=risk_flags
-                            )
+                            exclusion_logs.append({
+                                "alert_id": alert_id,
+                                "rule_id": rule_id,
+                                "exclusion_reason": reason,
+                                "risk_flags": risk_flags
+                            })
+        
+        self._write_exclusion_logs(exclusion_logs)
         
         return alerts
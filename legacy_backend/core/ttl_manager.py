@@ -157,6 +157,94 @@ class TTLManager:
             logger.error("ttl_extension_error", error=str(e))
             raise e
     
+    @staticmethod
+    def transactions_partition_name(upload_id) -> str:
+        """Name of an upload's transactions partition (matches transactions_partition_name() in SQL)"""
+        return "transactions_" + str(upload_id).replace("-", "_")
+    
+    @staticmethod
+    def purge_upload_transactions(db: Session, upload_ids: list, drop_partitions: bool = True) -> int:
+        """
+        Delete all transactions belonging to the given uploads (TTL job only).
+        
+        When transactions is list-partitioned by upload_id (see
+        migrations/partition_transactions_by_upload.sql) each upload's
+        partition is detached and dropped: constant-time DDL that leaves no
+        dead tuples behind. DETACH takes an ACCESS EXCLUSIVE lock on the
+        parent table until commit, so request handlers must not call this;
+        they delete rows instead. Rows not covered by a partition
+        (unpartitioned table, default partition) are removed with a regular
+        DELETE.
+        
+        Args:
+            drop_partitions: If False, only DELETE rows (no DDL, no table lock)
+        
+        Returns:
+            Number of transactions removed (planner estimate for dropped partitions)
+        """
+        upload_ids = [str(upload_id) for upload_id in upload_ids]
+        if not upload_ids:
+            return 0
+        
+        partitions = []
+        if drop_partitions:
+            names = [TTLManager.transactions_partition_name(upload_id) for upload_id in upload_ids]
+            partitions = db.execute(
+                text("""
+                    SELECT c.relname, c.reltuples
+                    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = to_regclass('public.transactions')
+                      AND c.relname = ANY(:names)
+                """),
+                {"names": names}
+            ).all()
+        
+        removed = 0
+        if partitions:
+            # DETACH checks the alert_transactions FK, so clear referencing rows first
+            db.execute(
+                text("DELETE FROM alert_transactions WHERE upload_id = ANY(CAST(:ids AS uuid[]))"),
+                {"ids": upload_ids}
+            )
+        for name, reltuples in partitions:
+            # reltuples is -1 for a partition that was never vacuumed/analyzed
+            removed += max(0, int(reltuples))
+            db.execute(text(f'ALTER TABLE public.transactions DETACH PARTITION public."{name}"'))
+            db.execute(text(f'DROP TABLE public."{name}"'))
+        
+        # Whatever no partition covered (unpartitioned table, default partition)
+        result = db.execute(
+            text("DELETE FROM transactions WHERE upload_id = ANY(CAST(:ids AS uuid[]))"),
+            {"ids": upload_ids}
+        )
+        removed += result.rowcount
+        
+        logger.info("upload_transactions_purged", upload_ids=upload_ids, transactions=removed)
+        return removed
+    
+    @staticmethod
+    def orphaned_partition_upload_ids(db: Session) -> list:
+        """
+        Upload IDs whose transactions partition outlived its data_uploads row.
+        
+        Replacing uploads deletes their rows (not partitions) and may delete the
+        upload records too, leaving empty partitions for the TTL job to drop.
+        """
+        prefix = TTLManager.transactions_partition_name("")
+        names = db.execute(
+            text("""
+                SELECT c.relname
+                FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass('public.transactions')
+                  AND c.relname <> 'transactions_default'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM data_uploads d
+                      WHERE 'transactions_' || replace(d.upload_id::text, '-', '_') = c.relname
+                  )
+            """)
+        ).scalars().all()
+        return [name[len(prefix):].replace("_", "-") for name in names]
+    
     @staticmethod
     def cleanup_expired(db: Session, dry_run: bool = False) -> dict:
         """
@@ -187,7 +275,16 @@ class TTLManager:
         
         expired_ids = [str(row[0]) for row in expired_uploads]
         
+        # Partitions left behind by replaced uploads hold no rows; drop them here
+        # rather than in the upload handlers so requests never lock transactions.
+        # The DDL locks transactions even when rolled back, so dry runs skip it
+        orphaned_ids = [] if dry_run else TTLManager.orphaned_partition_upload_ids(db)
+        if orphaned_ids:
+            TTLManager.purge_upload_transactions(db, orphaned_ids)
+        
         if not expired_ids:
+            if orphaned_ids:
+                db.commit()
             logger.info("cleanup_no_expired_data")
             return {
                 "alerts_anonymized": 0,
@@ -221,12 +318,9 @@ class TTLManager:
         )
         alerts_anonymized = anonymize_result.rowcount
         
-        # STEP 2: Delete transactions (raw PII)
-        txn_result = db.execute(
-            text("DELETE FROM transactions WHERE upload_id = ANY(:ids::uuid[])"),
-            {"ids": expired_ids}
-        )
-        transactions_deleted = txn_result.rowcount
+        # STEP 2: Delete transactions (raw PII) - drops whole partitions when partitioned
+        # (dry runs delete rows instead, so nothing takes the DETACH table lock)
+        transactions_deleted = TTLManager.purge_upload_transactions(db, expired_ids, drop_partitions=not dry_run)
         
         # STEP 3: Delete customers (FK cascade sets alert.customer_id = NULL)
         cust_result = db.execute(
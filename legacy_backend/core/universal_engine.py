@@ -1,8 +1,11 @@
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Union
+from dataclasses import dataclass, field
 from datetime import timedelta
+from functools import partial
 import logging
+import operator
 from simpleeval import simple_eval
 import uuid
 
@@ -12,6 +15,8 @@ from .smart_layer import SmartLayerProcessor
 
 logger = logging.getLogger(__name__)
 
+FilterOp = Callable[[pd.DataFrame], pd.DataFrame]
+
 class FilterProcessor:
     """
     Handles the filtering of transaction data based on scenario configurations.
@@ -20,42 +25,58 @@ class FilterProcessor:
     def apply_filters(self, transactions: pd.DataFrame, filter_config) -> pd.DataFrame:
         if not filter_config:
             return transactions
-            
-        df = transactions.copy()
+        
+        return self.run_filters(transactions.copy(), self.compile_filters(filter_config))
+    
+    def run_filters(self, df: pd.DataFrame, filter_ops: List[FilterOp]) -> pd.DataFrame:
+        """Apply pre-compiled filter steps in order."""
+        for op in filter_ops:
+            df = op(df)
+        return df
+    
+    def compile_filters(self, filter_config) -> List[FilterOp]:
+        """
+        Resolve a filter config into an ordered list of DataFrame -> DataFrame steps.
+        
+        All attribute probing happens here once, so running the steps against
+        each batch does no config dispatch.
+        """
+        if not filter_config:
+            return []
         
         # Handle simple array format from frontend
         if isinstance(filter_config, list):
-            for filter_item in filter_config:
-                df = self._apply_single_filter(df, filter_item)
-            return df
+            return [partial(self._apply_single_filter, filter_config=item) for item in filter_config]
+        
+        ops = []
         
         # Handle complex ScenarioFilters object format
-        if hasattr(filter_config, 'transaction_type') and filter_config.transaction_type:
-            df = df[df['transaction_type'].isin(filter_config.transaction_type)]
-            
-        if hasattr(filter_config, 'channel') and filter_config.channel:
-            df = df[df['channel'].isin(filter_config.channel)]
-            
-        if hasattr(filter_config, 'direction') and filter_config.direction:
-            if filter_config.direction == 'debit':
-                df = df[df['debit_credit_indicator'] == 'D']
-            elif filter_config.direction == 'credit':
-                df = df[df['debit_credit_indicator'] == 'C']
+        transaction_types = getattr(filter_config, 'transaction_type', None)
+        if transaction_types:
+            ops.append(lambda df, v=transaction_types: df[df['transaction_type'].isin(v)])
+            
+        channels = getattr(filter_config, 'channel', None)
+        if channels:
+            ops.append(lambda df, v=channels: df[df['channel'].isin(v)])
+            
+        direction = getattr(filter_config, 'direction', None)
+        indicator = {'debit': 'D', 'credit': 'C'}.get(direction)
+        if indicator:
+            ops.append(lambda df, v=indicator: df[df['debit_credit_indicator'] == v])
                 
         # 2. Amount Range
-        if hasattr(filter_config, 'amount_range') and filter_config.amount_range:
-            ar = filter_config.amount_range
+        ar = getattr(filter_config, 'amount_range', None)
+        if ar:
             if ar.min is not None:
-                df = df[df['transaction_amount'] >= ar.min]
+                ops.append(lambda df, v=ar.min: df[df['transaction_amount'] >= v])
             if ar.max is not None:
-                df = df[df['transaction_amount'] <= ar.max]
+                ops.append(lambda df, v=ar.max: df[df['transaction_amount'] <= v])
                 
         # 3. Custom Field Filters
-        if hasattr(filter_config, 'custom_field_filters') and filter_config.custom_field_filters:
-            for custom in filter_config.custom_field_filters:
-                df = self._apply_single_filter(df, custom)
+        for custom in getattr(filter_config, 'custom_field_filters', None) or []:
+            ops.append(partial(self._apply_single_filter, filter_config=custom))
                 
-        return df
+        return ops
     
     def _apply_single_filter(self, df: pd.DataFrame, filter_config: Any) -> pd.DataFrame:
         """
@@ -251,9 +272,6 @@ class AggregationProcessor:
             print("[ERROR] transaction_date required for rolling window")
             return pd.DataFrame()
         
-        # Sort by date
-        df = df.sort_values(['customer_id', 'transaction_date'])
-        
         window_value = tw.value
         window_unit = tw.unit
         
@@ -281,6 +299,9 @@ class AggregationProcessor:
         
         print(f"[ROLLING] Using entity_key: {entity_key}")
         
+        # Sort by entity then date with a single stable integer sort
+        df = df.iloc[self._entity_date_order(df, entity_key)]
+        
         for customer_id in df[entity_key].unique():
             cust_df = df[df[entity_key] == customer_id].copy()
             
@@ -318,6 +339,20 @@ class AggregationProcessor:
         
         return result_df
 
+    @staticmethod
+    def _entity_date_order(df: pd.DataFrame, entity_key: str) -> np.ndarray:
+        """
+        Row positions ordering df by (entity_key, transaction_date).
+
+        Factorizing the entity column and viewing dates as int64 turns the
+        multi-key sort into an integer lexsort instead of comparing tuples.
+        lexsort is used rather than a packed `code * span + date` key since
+        nanosecond date spans overflow int64 once multiplied by the entity count.
+        """
+        entity_codes, _ = pd.factorize(df[entity_key], sort=True)
+        dates = df['transaction_date'].values.astype('int64')
+        return np.lexsort((dates, entity_codes))
+
 class ThresholdProcessor:
     def apply_thresholds(self, aggregated_data: pd.DataFrame, customers: pd.DataFrame, threshold_config) -> pd.DataFrame:
         if threshold_config is None or aggregated_data.empty:
@@ -379,16 +414,31 @@ class ThresholdProcessor:
         return aggregated_data
 
 class AlertConditionEvaluator:
+    # Expressions that are a plain comparison of the aggregate against its
+    # threshold are evaluated as a single vector comparison instead of
+    # going through simpleeval row by row.
+    TRIVIAL_EXPRESSIONS = {
+        'aggregated_value > threshold': operator.gt,
+        'aggregated_value >= threshold': operator.ge,
+        'aggregated_value < threshold': operator.lt,
+    }
+
     def evaluate_condition(self, data: pd.DataFrame, condition_config) -> pd.DataFrame:
         if data.empty: return pd.DataFrame()
         
-        if 'threshold' in data.columns and 'aggregated_value' in data.columns:
-             alerts = data[data['aggregated_value'] > data['threshold']].copy()
-             if not condition_config: return alerts
-             if not getattr(condition_config, 'expression', None): return alerts
+        has_threshold = 'threshold' in data.columns and 'aggregated_value' in data.columns
+        expr = getattr(condition_config, 'expression', None) if condition_config else None
+        
+        if has_threshold and not expr:
+            return data[data['aggregated_value'].to_numpy() > data['threshold'].to_numpy()].copy()
         
         if not condition_config: return pd.DataFrame()
-        expr = condition_config.expression
+        
+        # Fast path: no interpreter for the common comparison expressions
+        compare = self.TRIVIAL_EXPRESSIONS.get(' '.join(str(expr).split()))
+        if compare is not None and has_threshold:
+            mask = compare(data['aggregated_value'].to_numpy(), data['threshold'].to_numpy())
+            return data[mask].copy()
         
         def safe_eval(row):
             try:
@@ -399,6 +449,18 @@ class AlertConditionEvaluator:
         alerts = data[data.apply(safe_eval, axis=1)].copy()
         return alerts
 
+@dataclass
+class CompiledScenario:
+    """
+    A scenario config with its config-dependent dispatch resolved up front.
+    
+    Built by UniversalScenarioEngine.compile and accepted by execute in
+    place of a ScenarioConfigModel.
+    """
+    config: ScenarioConfigModel
+    required_customer_fields: frozenset
+    filter_ops: List[FilterOp] = field(default_factory=list)
+
 class UniversalScenarioEngine:
     """
     Universal, schema-agnostic AML scenario execution engine.
@@ -437,6 +499,10 @@ class UniversalScenarioEngine:
         >>> print(f"Generated {len(alerts)} alerts")
     """
     
+    # scenario_id -> (config fingerprint, CompiledScenario), shared across
+    # engine instances so chunked runs compile each scenario once
+    _compiled_cache: Dict[str, tuple] = {}
+    
     def __init__(self, db_session=None):
         """
         Initialize the scenario execution engine.
@@ -452,6 +518,32 @@ class UniversalScenarioEngine:
         self.condition_evaluator = AlertConditionEvaluator()
         self.smart_layer = SmartLayerProcessor(db_session) if db_session else None
     
+    def compile(self, scenario_config: ScenarioConfigModel) -> CompiledScenario:
+        """
+        Precompile a scenario config into a CompiledScenario.
+        
+        Results are cached by scenario_id and reused for as long as the
+        config content is unchanged.
+        
+        Args:
+            scenario_config: Validated scenario configuration
+            
+        Returns:
+            CompiledScenario ready to pass to execute
+        """
+        fingerprint = scenario_config.model_dump_json()
+        cached = self._compiled_cache.get(scenario_config.scenario_id)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        
+        compiled = CompiledScenario(
+            config=scenario_config,
+            required_customer_fields=frozenset(self._get_required_customer_fields(scenario_config)),
+            filter_ops=self.filter_processor.compile_filters(scenario_config.filters),
+        )
+        self._compiled_cache[scenario_config.scenario_id] = (fingerprint, compiled)
+        return compiled
+    
     def _get_required_customer_fields(self, scenario_config: ScenarioConfigModel) -> set:
         """
         Intelligently determines which customer fields are needed for the scenario.
@@ -571,7 +663,7 @@ class UniversalScenarioEngine:
 
         return merged
 
-    def execute(self, scenario_config: ScenarioConfigModel, transactions: pd.DataFrame, customers: pd.DataFrame, run_id: str) -> List[Dict]:
+    def execute(self, scenario_config: Union[ScenarioConfigModel, CompiledScenario], transactions: pd.DataFrame, customers: pd.DataFrame, run_id: str) -> List[Dict]:
         """
         Execute an AML scenario against transaction data.
         
@@ -580,6 +672,7 @@ class UniversalScenarioEngine:
         
         Args:
             scenario_config: Validated scenario configuration (Pydantic model)
+                or a CompiledScenario from compile()
             transactions: Transaction DataFrame with columns:
                 - transaction_id (str, required)
                 - customer_id (str, required)
@@ -616,14 +709,15 @@ class UniversalScenarioEngine:
             >>> for alert in alerts:
             ...     print(f"Alert for {alert['customer_name']}: {alert['risk_score']}")
         """
-        # Step 0: Intelligent Customer Field Detection
-        required_customer_fields = self._get_required_customer_fields(scenario_config)
+        # Step 0: Intelligent Customer Field Detection (resolved at compile time)
+        compiled = scenario_config if isinstance(scenario_config, CompiledScenario) else self.compile(scenario_config)
+        scenario_config = compiled.config
         
         # Step 1: Smart Merge
-        enriched_data = self._smart_merge_customers(transactions, customers, required_customer_fields)
+        enriched_data = self._smart_merge_customers(transactions, customers, set(compiled.required_customer_fields))
         
         # Step 2: Apply Filters
-        filtered = self.filter_processor.apply_filters(enriched_data, scenario_config.filters)
+        filtered = self.filter_processor.run_filters(enriched_data, compiled.filter_ops)
         if filtered.empty:
             print("[WARN] All transactions filtered out!")
             return []
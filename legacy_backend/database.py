@@ -1,36 +1,75 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from fastapi import Header, HTTPException
 import os
+import orjson
 from tempfile import mkdtemp
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Global cache for engines
-# Key: db_url, Value: sessionmaker
+# Key: db_url, Value: (Engine, sessionmaker bound to it)
 _engine_cache = {}
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
 # Enforce Supabase PostgreSQL - No SQLite fallback
 DEFAULT_DB_URL = os.getenv("DATABASE_URL", "").strip()
 if not DEFAULT_DB_URL:
     raise RuntimeError("DATABASE_URL environment variable is required. Please configure Supabase connection.")
 
+def _json_serializer(obj) -> str:
+    """Serialize JSON/JSONB column values with orjson (handles datetime, UUID and numpy natively)"""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+def _pool_reset_on_return():
+    reset = os.getenv("DB_POOL_RESET_ON_RETURN", "rollback").strip().lower()
+    return None if reset == "none" else reset
+
+def _engine_kwargs(db_url: str, pool_size: int, max_overflow: int) -> dict:
+    """create_engine arguments; SQLite URLs keep SQLAlchemy's default pool."""
+    kwargs = {"pool_pre_ping": True, "json_serializer": _json_serializer}
+    if not db_url.startswith("sqlite"):
+        kwargs.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),  # Below Supabase/PgBouncer idle timeouts
+            # LIFO reuses the most recently returned connection, so overflow
+            # connections sit idle at the tail and get recycled when traffic drops
+            pool_use_lifo=True,
+            # Session.close() already rolls back; behind a transaction-mode
+            # PgBouncer DB_POOL_RESET_ON_RETURN=none skips the second ROLLBACK
+            pool_reset_on_return=_pool_reset_on_return(),
+            # Rows per multi-row INSERT for session.execute(insert(Model), rows);
+            # PostgreSQL throughput plateaus around 10k rows per statement
+            insertmanyvalues_page_size=int(os.getenv("DB_INSERT_PAGE_SIZE", "10000")),
+        )
+    return kwargs
+
 # For initial boot/migrations where no request context exists
 def get_default_engine():
     return _get_engine(DEFAULT_DB_URL)
 
 def _get_engine(db_url: str):
+    """Returns the cached sessionmaker for db_url."""
+    return _get_engine_entry(db_url)[1]
+
+def _get_engine_entry(db_url: str):
     if not db_url:
          raise HTTPException(status_code=500, detail="Database URL not configured.")
 
     if db_url not in _engine_cache:
         try:
             # PostgreSQL connection with pool_pre_ping for resilience
-            engine = create_engine(db_url, pool_pre_ping=True, pool_size=10, max_overflow=20)
-            _engine_cache[db_url] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            engine = create_engine(db_url, **_engine_kwargs(
+                db_url,
+                pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+                max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20"))
+            ))
+            _engine_cache[db_url] = (engine, sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine))
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid Database Connection String: {str(e)}")
             
@@ -45,13 +84,13 @@ def get_service_engine():
     
     if "service_engine" not in _engine_cache:
         try:
-            engine = create_engine(target_url, pool_pre_ping=True, pool_size=5, max_overflow=10)
-            _engine_cache["service_engine"] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            engine = create_engine(target_url, **_engine_kwargs(target_url, pool_size=5, max_overflow=10))
+            _engine_cache["service_engine"] = (engine, sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine))
         except Exception as e:
              print(f"Service role engine init failed: {e}")
              return get_default_engine()
 
-    return _engine_cache["service_engine"]
+    return _engine_cache["service_engine"][1]
 
 def resolve_db_url(url_or_alias: str) -> str:
     """Helper to resolve 'local' alias to Supabase PostgreSQL."""
@@ -77,5 +116,4 @@ def get_db(x_db_url: str = Header(None)):
 
 # Expose global engine/SessionLocal for scripts that import them directly
 # ensuring they use the default fallback
-engine = get_default_engine().kw['bind']
-SessionLocal = get_default_engine()
+engine, SessionLocal = _get_engine_entry(DEFAULT_DB_URL)
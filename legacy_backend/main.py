@@ -1,7 +1,8 @@
-from fastapi import FastAPI, Request, Depends, Response
+from fastapi import FastAPI, Request, Response, Header
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from database import engine, Base, get_db
+from sqlalchemy import text, inspect
+from database import engine, Base, resolve_db_url, _get_engine
 from models import (
     Transaction, Customer, Alert, ScenarioConfig, 
     VerifiedEntity, AuditLog, AlertExclusionLog, 
@@ -9,11 +10,20 @@ from models import (
 )
 import os
 import time
+import random
+import asyncio
+import orjson
+import redis
 import structlog
+from supabase import create_client
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+def _orjson_dumps(obj, default=None, **kwargs) -> str:
+    """JSONRenderer serializer: orjson, decoded to str for the stdlib logger"""
+    return orjson.dumps(obj, default=default).decode()
+
 # Structured logging configuration
 structlog.configure(
     processors=[
@@ -23,7 +33,7 @@ structlog.configure(
         structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.StackInfoRenderer(),
         structlog.dev.set_exc_info,
-        structlog.processors.JSONRenderer()
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps)
     ],
     logger_factory=structlog.stdlib.LoggerFactory(),
     wrapper_class=structlog.stdlib.BoundLogger,
@@ -32,18 +42,31 @@ structlog.configure(
 
 logger = structlog.get_logger("sas_simulator")
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables only when asked to (migration/bootstrap job); in
+# normal worker boots the schema is owned by migrations
+if os.getenv("RUN_DB_CREATE_ALL", "false").lower() == "true":
+    # One reflection query for all table names instead of a has_table check per table
+    existing_tables = set(inspect(engine).get_table_names())
+    missing_tables = [t for t in Base.metadata.sorted_tables if t.name not in existing_tables]
+    if missing_tables:
+        Base.metadata.create_all(bind=engine, tables=missing_tables, checkfirst=False)
 
 from api import data, simulation, comparison, rules, risk, dashboard, admin, validation, fields, investigation
 
-# Rate limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=["200/minute"])
+# Rate limiter: counters live in Redis when REDIS_URL is set so the quota
+# holds across workers; falls back to in-process memory otherwise
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["200/minute"],
+    storage_uri=os.getenv("REDIS_URL"),
+    strategy="fixed-window",
+)
 
 app = FastAPI(
     title="SAS Sandbox Simulator API",
     version="1.0.0",
-    description="Enterprise-grade AML/CFT scenario simulation platform"
+    description="Enterprise-grade AML/CFT scenario simulation platform",
+    default_response_class=ORJSONResponse,
 )
 
 # Add rate limiter to app state
@@ -66,24 +89,38 @@ app.add_middleware(
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
+    # Only the headers the frontend sends; a fixed list lets the middleware
+    # answer preflights without echoing the request headers back
+    allow_headers=["authorization", "content-type", "x-db-url"],
     expose_headers=["*"], # Ensure custom headers like x-db-url are visible
+    max_age=86400,  # Browsers cache preflight responses for a day
 )
 
+# Request logging: probe/scrape endpoints and CORS preflights are not logged,
+# other successful requests are sampled at LOG_SAMPLE_RATE; 5xx always logged
+LOG_SKIP_PATHS = frozenset({"/health", "/metrics", "/", "/favicon.ico"})
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
 # Request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    if request.method == "OPTIONS" or request.url.path in LOG_SKIP_PATHS:
+        return await call_next(request)
+    
+    start_time = time.perf_counter()
     
     response = await call_next(request)
     
-    duration = time.time() - start_time
+    if response.status_code < 500 and LOG_SAMPLE_RATE < 1.0 and random.random() >= LOG_SAMPLE_RATE:
+        return response
+    
+    duration_ms = (time.perf_counter() - start_time) * 1000.0
     logger.info(
         "http_request",
         method=request.method,
         path=request.url.path,
         status_code=response.status_code,
-        duration_ms=round(duration * 1000, 2),
+        duration_ms=duration_ms,
         client_ip=get_remote_address(request)
     )
     
@@ -106,38 +143,43 @@ app.include_router(investigation.router) # Investigation & Traceability
 async def root():
     return {"message": "SAS Sandbox Simulator API is running", "version": "1.0.0"}
 
-@app.get("/health")
-async def health_check(response: Response, db: Session = Depends(get_db)):
+def _build_health_clients():
     """
-    Comprehensive health check endpoint
-    
-    Checks:
-    1. Upstash Redis connection
-    2. PostgreSQL database connection
-    3. Supabase Auth service
-    
-    Returns:
-        {
-            "status": "healthy" | "degraded" | "unhealthy",
-            "checks": {
-                "redis": {...},
-                "database": {...},
-                "auth": {...}
-            }
-        }
+    Build the Redis and Supabase clients probed by /health, once per process.
+    Returns (redis_client, supabase_client, supabase_error).
     """
-    import redis
-    from supabase import create_client
+    redis_url = os.getenv("REDIS_URL")
+    redis_client = redis.from_url(redis_url, socket_connect_timeout=5) if redis_url else None
+    
+    supabase_client, supabase_error = None, None
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_ANON_KEY")
+    if supabase_url and supabase_key:
+        try:
+            supabase_client = create_client(supabase_url, supabase_key)
+        except Exception as e:
+            supabase_error = e
     
+    return redis_client, supabase_client, supabase_error
+
+_redis_client, _supabase_client, _supabase_error = _build_health_clients()
+
+# /health is polled by load balancers and probes; results are reused for a
+# few seconds so probes don't compete with real traffic for pool slots
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+_health_cache = {}  # resolved DB URL -> (monotonic timestamp, payload, status_code)
+_health_lock = asyncio.Lock()
+
+def _run_health_checks(db: Session):
+    """Probe Redis, the database and Supabase Auth. Returns (payload, status_code)."""
     checks = {}
     overall_status = "healthy"
     
     # 1. Check Upstash Redis
     try:
         redis_url = os.getenv("REDIS_URL")
-        if redis_url:
-            r = redis.from_url(redis_url, socket_connect_timeout=5)
-            r.ping()
+        if _redis_client is not None:
+            _redis_client.ping()
             checks["redis"] = {
                 "status": "healthy",
                 "message": "Connected to Redis",
@@ -172,39 +214,32 @@ async def health_check(response: Response, db: Session = Depends(get_db)):
         }
         overall_status = "unhealthy"
     
-    # 3. Check Supabase Auth
-    try:
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_ANON_KEY")
-        
-        if supabase_url and supabase_key:
-            supabase = create_client(supabase_url, supabase_key)
-            # Test auth service by checking if it's reachable
-            # Note: This doesn't actually authenticate, just checks service availability
-            checks["auth"] = {
-                "status": "healthy",
-                "message": "Supabase Auth configured",
-                "url": supabase_url
-            }
-        else:
-            checks["auth"] = {
-                "status": "warning",
-                "message": "Supabase Auth not configured"
-            }
-            if overall_status == "healthy":
-                overall_status = "degraded"
-    except Exception as e:
+    # 3. Check Supabase Auth (client is built once at startup)
+    if _supabase_error is not None:
         checks["auth"] = {
             "status": "unhealthy",
-            "message": f"Auth service check failed: {str(e)}"
+            "message": f"Auth service check failed: {str(_supabase_error)}"
         }
         overall_status = "unhealthy"
+    elif _supabase_client is not None:
+        checks["auth"] = {
+            "status": "healthy",
+            "message": "Supabase Auth configured",
+            "url": os.getenv("SUPABASE_URL")
+        }
+    else:
+        checks["auth"] = {
+            "status": "warning",
+            "message": "Supabase Auth not configured"
+        }
+        if overall_status == "healthy":
+            overall_status = "degraded"
     
     # Set appropriate HTTP status code
     if overall_status == "unhealthy":
-        response.status_code = 503
-    elif overall_status == "degraded":
-        response.status_code = 200  # Still 200 OK but with warnings
+        status_code = 503
+    else:
+        status_code = 200  # Degraded is still 200 OK but with warnings
     
     logger.info(
         "health_check_completed",
@@ -220,7 +255,48 @@ async def health_check(response: Response, db: Session = Depends(get_db)):
         "version": "1.0.0",
         "environment": os.getenv("ENVIRONMENT", "development"),
         "checks": checks
-    }
+    }, status_code
+
+@app.get("/health")
+async def health_check(response: Response, x_db_url: str = Header(None)):
+    """
+    Comprehensive health check endpoint
+    
+    Checks:
+    1. Upstash Redis connection
+    2. PostgreSQL database connection
+    3. Supabase Auth service
+    
+    Returns:
+        {
+            "status": "healthy" | "degraded" | "unhealthy",
+            "checks": {
+                "redis": {...},
+                "database": {...},
+                "auth": {...}
+            }
+        }
+    """
+    # Same resolution as get_db, so each target database gets its own result
+    db_url = resolve_db_url(x_db_url or "local")
+    
+    cached = _health_cache.get(db_url)
+    if cached is None or time.monotonic() - cached[0] >= HEALTH_CACHE_TTL:
+        async with _health_lock:
+            # Another request may have refreshed the result while we waited
+            cached = _health_cache.get(db_url)
+            if cached is None or time.monotonic() - cached[0] >= HEALTH_CACHE_TTL:
+                # Only a refresh checks out a connection; cache hits never touch the pool
+                db = _get_engine(db_url)()
+                try:
+                    payload, status_code = _run_health_checks(db)
+                finally:
+                    db.close()
+                cached = _health_cache[db_url] = (time.monotonic(), payload, status_code)
+    
+    _, payload, status_code = cached
+    response.status_code = status_code
+    return payload
 
 # Prometheus metrics endpoint
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
@@ -235,6 +311,11 @@ from pydantic import BaseModel
 class ConnectionRequest(BaseModel):
     db_url: str
 
+# Recent /api/connect results keyed by a hash of the URL (never the URL itself,
+# which carries credentials) so repeated "test" clicks don't redo the handshake
+CONNECTION_TEST_TTL = 10.0
+_connection_test_cache = {}  # url sha256 -> (monotonic timestamp, result)
+
 @app.post("/api/connect")
 async def test_connection(request: ConnectionRequest):
     """
@@ -243,6 +324,8 @@ async def test_connection(request: ConnectionRequest):
     Only PostgreSQL connections are supported.
     """
     from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+    import hashlib
     import logging
     
     logger = logging.getLogger(__name__)
@@ -254,22 +337,37 @@ async def test_connection(request: ConnectionRequest):
             "message": "Only PostgreSQL databases are supported. URL must start with 'postgresql://' or 'postgres://'"
         }
     
+    cache_key = hashlib.sha256(request.db_url.encode()).hexdigest()
+    cached = _connection_test_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < CONNECTION_TEST_TTL:
+        return cached[1]
+    
+    engine = None
     try:
-        # Try connecting with a short timeout
+        # Try connecting with a short timeout; NullPool keeps no pool around afterwards
         engine = create_engine(
             request.db_url, 
+            poolclass=NullPool,
             connect_args={"connect_timeout": 5}
         )
         with engine.connect() as connection:
             connection.execute(text("SELECT 1"))
-        return {"status": "connected", "message": "Connection Successful"}
+        result = {"status": "connected", "message": "Connection Successful"}
     except Exception as e:
         # Log detailed error server-side
         logger.error(f"Database connection failed: {str(e)}")
         
         # Return generic error to client
-        return {
+        result = {
             "status": "failed", 
             "message": "Unable to connect to database. Please verify your connection string and ensure the database is accessible."
         }
+    finally:
+        if engine is not None:
+            engine.dispose()
+    
+    if len(_connection_test_cache) >= 256:
+        _connection_test_cache.clear()
+    _connection_test_cache[cache_key] = (time.monotonic(), result)
+    return result
 
@@ -0,0 +1,23 @@
+-- Migration: Index the TTL cleanup lookup on data_uploads
+-- Date: 2026-10-17
+-- Purpose: Let cleanup find expired active uploads without scanning data_uploads
+
+-- TTLManager.cleanup_expired and the admin TTL stats both run
+--   SELECT ... FROM data_uploads WHERE expires_at < :now AND status = 'active'
+-- and then delete transactions/customers by upload_id, which is already indexed
+-- on both tables. A partial index over active uploads only keeps the hot set
+-- small: expired uploads drop out of it once they are marked 'expired'.
+
+-- CONCURRENTLY avoids locking uploads while the index builds; it cannot run
+-- inside a transaction block, so this migration has no BEGIN/COMMIT.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_data_uploads_active_expiry
+  ON public.data_uploads (expires_at)
+  WHERE status = 'active';
+
+-- ============================================================
+-- VERIFICATION QUERIES
+-- ============================================================
+-- Expect an Index Scan using idx_data_uploads_active_expiry
+EXPLAIN
+SELECT upload_id FROM public.data_uploads
+WHERE expires_at < now() AND status = 'active';
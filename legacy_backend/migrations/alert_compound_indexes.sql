@@ -0,0 +1,21 @@
+-- Migration: Compound and partial indexes for alert queries
+-- Date: 2026-10-17
+-- Purpose: Match the Alert.__table_args__ indexes in models.py
+
+-- Run totals and comparisons filter run_id AND excluded; scenario views read
+-- alerts per scenario ordered by date; the dashboard counts open HIGH alerts
+-- per run. ix_alerts_run_excluded leads with run_id, so the single-column
+-- ix_alerts_run_id becomes redundant and is dropped.
+-- CONCURRENTLY cannot run inside a transaction block.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alerts_run_excluded
+  ON public.alerts (run_id, excluded);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alerts_scenario_date
+  ON public.alerts (scenario_id, alert_date);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alerts_open
+  ON public.alerts (run_id, risk_classification)
+  WHERE alert_status = 'OPN';
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_alerts_run_id;
@@ -0,0 +1,33 @@
+-- Migration: Covering indexes for run comparisons and per-upload scans
+-- Date: 2026-10-17
+-- Purpose: Match ix_alerts_run_customer and ix_tx_upload_created in models.py
+
+-- ComparisonEngine counts alerts per run and groups each run's alerts by
+-- customer_id, reading alert_id, risk_score and scenario_id. With those in
+-- INCLUDE the comparison is served by an index-only scan (once the table has
+-- been vacuumed) instead of fetching every alert row from the heap.
+--
+-- Transactions are scanned per upload_id and read created_at (traceability,
+-- beneficiary history). The (upload_id, created_at) index also serves
+-- upload_id alone, so the single-column ix_transactions_upload_id is dropped
+-- and ingestion keeps the same number of indexes to maintain. raw_data is
+-- deliberately not included: it is far too wide to cover.
+-- CONCURRENTLY cannot run inside a transaction block, nor on a partitioned
+-- table: run this before partition_transactions_by_upload.sql.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_alerts_run_customer
+  ON public.alerts (run_id, customer_id)
+  INCLUDE (alert_id, risk_score, scenario_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tx_upload_created
+  ON public.transactions (upload_id, created_at);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_transactions_upload_id;
+
+-- ============================================================
+-- VERIFICATION QUERIES
+-- ============================================================
+-- Expect an Index Only Scan using ix_alerts_run_customer
+EXPLAIN
+SELECT customer_id, count(*), max(risk_score) FROM public.alerts
+WHERE run_id = '<run_id>' GROUP BY customer_id;
@@ -0,0 +1,136 @@
+-- Migration: LIST-partition transactions by upload_id
+-- Date: 2026-10-17
+-- Purpose: Turn TTL purges into partition DROPs
+
+-- Transactions are only ever removed a whole upload at a time (TTL cleanup,
+-- replacing a user's previous upload). With one partition per upload, the
+-- TTL job (TTLManager.purge_upload_transactions) detaches and drops the
+-- partition instead of deleting every row, so purges are constant-time and
+-- leave no dead tuples or index bloat behind for VACUUM. DETACH locks the
+-- parent ACCESS EXCLUSIVE, so upload replacement keeps deleting rows and
+-- leaves the emptied partition for the TTL job to drop.
+--
+-- * The primary key becomes (transaction_id, upload_id): a partitioned table's
+--   unique constraints must contain the partition key. Ingestion already
+--   upserts ON CONFLICT (transaction_id, upload_id) and alert_transactions
+--   already references both columns.
+-- * A trigger on data_uploads creates the upload's partition as soon as the
+--   upload row is inserted, i.e. before any transaction is loaded.
+-- * A DEFAULT partition catches rows of uploads without their own partition.
+-- * Rows with a NULL upload_id cannot be keyed: the migration aborts if any
+--   exist, so assign or delete them first.
+--
+-- Run order: after simplify_schema.sql, raw_data_jsonb.sql and
+-- covering_indexes.sql. Their CREATE INDEX CONCURRENTLY statements fail on a
+-- partitioned parent; this file creates the transactions indexes itself.
+--
+-- Takes an ACCESS EXCLUSIVE lock on transactions while the data is copied:
+-- run it in a maintenance window.
+
+BEGIN;
+
+-- ============================================================
+-- 0. GUARD: EVERY ROW MUST HAVE A PARTITION KEY
+-- ============================================================
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM public.transactions WHERE upload_id IS NULL) THEN
+    RAISE EXCEPTION 'transactions has rows with a NULL upload_id; assign or delete them before partitioning';
+  END IF;
+END $$;
+
+-- ============================================================
+-- 1. PARTITIONED PARENT
+-- ============================================================
+CREATE TABLE public.transactions_partitioned
+  (LIKE public.transactions INCLUDING DEFAULTS)
+  PARTITION BY LIST (upload_id);
+
+ALTER TABLE public.transactions_partitioned
+  ADD PRIMARY KEY (transaction_id, upload_id),
+  ADD FOREIGN KEY (customer_id) REFERENCES public.customers (customer_id),
+  ADD FOREIGN KEY (upload_id) REFERENCES public.data_uploads (upload_id);
+
+CREATE TABLE public.transactions_default
+  PARTITION OF public.transactions_partitioned DEFAULT;
+
+-- Must match TTLManager.transactions_partition_name
+CREATE OR REPLACE FUNCTION public.transactions_partition_name(p_upload_id uuid)
+RETURNS text LANGUAGE sql IMMUTABLE AS $$
+  SELECT 'transactions_' || replace(p_upload_id::text, '-', '_')
+$$;
+
+-- ============================================================
+-- 2. ONE PARTITION PER EXISTING UPLOAD, THEN COPY
+-- ============================================================
+DO $$
+DECLARE
+  u uuid;
+BEGIN
+  FOR u IN SELECT DISTINCT upload_id FROM public.transactions LOOP
+    EXECUTE format(
+      'CREATE TABLE public.%I PARTITION OF public.transactions_partitioned FOR VALUES IN (%L)',
+      public.transactions_partition_name(u), u
+    );
+  END LOOP;
+END $$;
+
+INSERT INTO public.transactions_partitioned
+SELECT * FROM public.transactions;
+
+-- ============================================================
+-- 3. SWAP TABLES
+-- ============================================================
+ALTER TABLE public.alert_transactions
+  DROP CONSTRAINT IF EXISTS alert_transactions_transaction_id_upload_id_fkey;
+
+DROP TABLE public.transactions;
+
+ALTER TABLE public.transactions_partitioned RENAME TO transactions;
+ALTER TABLE public.transactions
+  RENAME CONSTRAINT transactions_partitioned_pkey TO transactions_pkey;
+
+-- Indexes on the parent cascade to every current and future partition
+CREATE INDEX ix_transactions_customer_id ON public.transactions (customer_id);
+CREATE INDEX ix_transactions_expires_at ON public.transactions (expires_at);
+CREATE INDEX ix_tx_upload_created ON public.transactions (upload_id, created_at);
+CREATE INDEX idx_transactions_raw_data_gin
+  ON public.transactions USING gin (raw_data jsonb_path_ops);
+
+ALTER TABLE public.alert_transactions
+  ADD CONSTRAINT alert_transactions_transaction_id_upload_id_fkey
+  FOREIGN KEY (transaction_id, upload_id)
+  REFERENCES public.transactions (transaction_id, upload_id)
+  ON DELETE CASCADE;
+
+-- ============================================================
+-- 4. CREATE PARTITIONS FOR NEW UPLOADS
+-- ============================================================
+CREATE OR REPLACE FUNCTION public.create_transactions_partition()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  EXECUTE format(
+    'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.transactions FOR VALUES IN (%L)',
+    public.transactions_partition_name(NEW.upload_id), NEW.upload_id
+  );
+  RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_data_uploads_transactions_partition ON public.data_uploads;
+CREATE TRIGGER trg_data_uploads_transactions_partition
+  AFTER INSERT ON public.data_uploads
+  FOR EACH ROW EXECUTE FUNCTION public.create_transactions_partition();
+
+COMMIT;
+
+-- ============================================================
+-- VERIFICATION QUERIES
+-- ============================================================
+-- One partition per upload (plus transactions_default)
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound
+FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'public.transactions'::regclass
+ORDER BY c.relname;
+
+-- Should be 0: every upload's rows live in its own partition
+SELECT count(*) FROM public.transactions_default;
@@ -0,0 +1,37 @@
+-- Migration: Store raw_data as JSONB and index it for containment filters
+-- Date: 2026-10-17
+-- Purpose: Binary raw_data documents (no re-parse on every read) with GIN indexes
+
+-- models.py declares raw_data as JSON, which maps to text-backed `json` on
+-- PostgreSQL when tables come from create_all. This converts transactions
+-- and customers to `jsonb` (a no-op where the column already is jsonb) and
+-- gives it the same '{}' server default as the model.
+
+BEGIN;
+
+ALTER TABLE public.transactions
+  ALTER COLUMN raw_data TYPE jsonb USING raw_data::jsonb,
+  ALTER COLUMN raw_data SET DEFAULT '{}'::jsonb;
+
+ALTER TABLE public.customers
+  ALTER COLUMN raw_data TYPE jsonb USING raw_data::jsonb,
+  ALTER COLUMN raw_data SET DEFAULT '{}'::jsonb;
+
+COMMIT;
+
+-- jsonb_path_ops indexes are smaller and cheaper to maintain than the default
+-- jsonb_ops, and serve the @> containment filters scenarios push down.
+-- CONCURRENTLY cannot run inside a transaction block, nor on a partitioned
+-- table: run this before partition_transactions_by_upload.sql.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transactions_raw_data_gin
+  ON public.transactions USING gin (raw_data jsonb_path_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_raw_data_gin
+  ON public.customers USING gin (raw_data jsonb_path_ops);
+
+-- ============================================================
+-- VERIFICATION QUERIES
+-- ============================================================
+SELECT table_name, column_name, data_type
+FROM information_schema.columns
+WHERE table_name IN ('transactions', 'customers') AND column_name = 'raw_data';
@@ -0,0 +1,35 @@
+-- Migration: Generate insert timestamps in PostgreSQL
+-- Date: 2026-10-17
+-- Purpose: Match models.py, where these columns moved from a Python default to a server default
+
+-- Bulk writers (COPY and bulk inserts) now omit these columns and rely on the
+-- column default, so existing tables must have it before the new code ships.
+-- timestamptz columns take now(); naive timestamp columns store UTC wall time.
+
+BEGIN;
+
+ALTER TABLE public.transactions ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE public.customers ALTER COLUMN created_at SET DEFAULT now();
+
+ALTER TABLE public.alerts
+  ALTER COLUMN created_at SET DEFAULT now(),
+  ALTER COLUMN updated_at SET DEFAULT now();
+
+ALTER TABLE public.alert_exclusion_logs
+  ALTER COLUMN exclusion_timestamp SET DEFAULT TIMEZONE('utc', CURRENT_TIMESTAMP);
+
+ALTER TABLE public.audit_logs
+  ALTER COLUMN "timestamp" SET DEFAULT TIMEZONE('utc', CURRENT_TIMESTAMP);
+
+COMMIT;
+
+-- ============================================================
+-- VERIFICATION QUERIES
+-- ============================================================
+SELECT table_name, column_name, column_default
+FROM information_schema.columns
+WHERE (table_name, column_name) IN (
+  ('transactions', 'created_at'), ('customers', 'created_at'),
+  ('alerts', 'created_at'), ('alerts', 'updated_at'),
+  ('alert_exclusion_logs', 'exclusion_timestamp'), ('audit_logs', 'timestamp')
+);
@@ -0,0 +1,25 @@
+-- Migration: Generate bulk-written primary keys in PostgreSQL
+-- Date: 2026-10-17
+-- Purpose: Match models.py, where these keys moved from a Python uuid4 default to a server default
+
+-- Exclusion logs (COPY / bulk INSERT) and beneficiary history (INSERT ... SELECT)
+-- no longer send a key per row; the column default fills it in, so existing
+-- tables need it before the new code ships. gen_random_uuid() is built in
+-- from PostgreSQL 13 (earlier versions need CREATE EXTENSION pgcrypto).
+
+BEGIN;
+
+ALTER TABLE public.alert_exclusion_logs
+  ALTER COLUMN log_id SET DEFAULT gen_random_uuid()::text;
+
+ALTER TABLE public.beneficiary_history
+  ALTER COLUMN history_id SET DEFAULT gen_random_uuid()::text;
+
+COMMIT;
+
+-- ============================================================
+-- VERIFICATION QUERIES
+-- ============================================================
+SELECT table_name, column_name, column_default
+FROM information_schema.columns
+WHERE (table_name, column_name) IN (('alert_exclusion_logs', 'log_id'), ('beneficiary_history', 'history_id'));
@@ -0,0 +1,17 @@
+-- Migration: Store small bounded counters and scores as smallint
+-- Date: 2026-10-17
+-- Purpose: Match models.py; 2-byte columns shrink alert and profile rows
+
+-- alerts.risk_score is capped at 100, progress_percentage at 100; SAR counts
+-- and account ages (days, ~89 years max) fit comfortably in int2.
+-- record_count_* stay integer: uploads routinely exceed 32767 rows.
+
+BEGIN;
+
+ALTER TABLE public.alerts ALTER COLUMN risk_score TYPE smallint;
+ALTER TABLE public.simulation_runs ALTER COLUMN progress_percentage TYPE smallint;
+ALTER TABLE public.customer_risk_profiles
+  ALTER COLUMN previous_sar_count TYPE smallint,
+  ALTER COLUMN account_age_days TYPE smallint;
+
+COMMIT;
@@ -1,15 +1,52 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, DECIMAL, Text, ForeignKey, JSON, Float, Index, ForeignKeyConstraint
+from sqlalchemy import Column, String, Integer, SmallInteger, DateTime, Boolean, DECIMAL, Text, ForeignKey, JSON, Float, Index, ForeignKeyConstraint
+from sqlalchemy import text, func
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 import uuid
 import datetime
 from datetime import datetime as dt, timezone
 from database import Base
 
+# raw_data documents: JSONB on PostgreSQL (binary, indexable), plain JSON elsewhere (SQLite tests)
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
 # Helper for consistent UTC timestamps
 def utc_now():
     return dt.now(timezone.utc)
 
+class utcnow(FunctionElement):
+    """Server-side UTC wall-clock timestamp, for naive (timezone=False) columns"""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow, 'postgresql')
+def _pg_utcnow(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+@compiles(utcnow)
+def _default_utcnow(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"  # Already UTC on SQLite
+
+class uuid_text(FunctionElement):
+    """Server-side random UUID as text, for String keys that bulk writers omit"""
+    type = String()
+    inherit_cache = True
+
+@compiles(uuid_text, 'postgresql')
+def _pg_uuid_text(element, compiler, **kw):
+    return "gen_random_uuid()::text"
+
+@compiles(uuid_text)
+def _default_uuid_text(element, compiler, **kw):
+    # SQLite has no UUID function: assemble a dashed version-4 UUID like PostgreSQL's
+    return (
+        "lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || "
+        "substr(hex(randomblob(2)), 2) || '-' || substr('89ab', 1 + abs(random()) % 4, 1) || "
+        "substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6)))"
+    )
+
 class Transaction(Base):
     """
     Schema-agnostic transaction model.
@@ -18,14 +55,23 @@ class Transaction(Base):
     __tablename__ = "transactions"
     
     # System columns only
+    # (transaction_id, upload_id) is the key: on PostgreSQL the table is LIST-partitioned
+    # by upload_id (migrations/partition_transactions_by_upload.sql) so TTL purges drop partitions
     transaction_id = Column(String, primary_key=True)
     customer_id = Column(String, ForeignKey("customers.customer_id"), nullable=False, index=True)
-    upload_id = Column(UUID(as_uuid=True), ForeignKey("data_uploads.upload_id"), nullable=True, index=True)
-    created_at = Column(DateTime(timezone=True), default=utc_now)  # UTC
+    upload_id = Column(UUID(as_uuid=True), ForeignKey("data_uploads.upload_id"), primary_key=True)  # Indexed via ix_tx_upload_created
+    created_at = Column(DateTime(timezone=True), server_default=func.now())  # UTC
     expires_at = Column(DateTime(timezone=True), nullable=True, index=True)  # UTC (TTL)
     
     # All user CSV data stored here
-    raw_data = Column(JSON, nullable=False, default={})
+    raw_data = Column(JSONDocument, nullable=False, default={}, server_default=text("'{}'"))
+
+    __table_args__ = (
+        # Per-upload scans that read created_at (also serves upload_id alone)
+        Index('ix_tx_upload_created', 'upload_id', 'created_at'),
+        # Containment filters on raw_data (raw_data @> '{"channel": "ATM"}')
+        Index('idx_transactions_raw_data_gin', 'raw_data', postgresql_using='gin', postgresql_ops={'raw_data': 'jsonb_path_ops'}),
+    )
 
     # Relationships
     customer = relationship("Customer", back_populates="transactions")
@@ -40,14 +86,18 @@ class Customer(Base):
     
     customer_id = Column(String, primary_key=True)
     upload_id = Column(UUID(as_uuid=True), ForeignKey('data_uploads.upload_id'), nullable=True, index=True)
-    raw_data = Column(JSON, nullable=False, default={})
+    raw_data = Column(JSONDocument, nullable=False, default={}, server_default=text("'{}'"))
     expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
-    created_at = Column(DateTime(timezone=True), default=utc_now)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Keep other relationships that work:
     transactions = relationship("Transaction", back_populates="customer")
     alerts = relationship("Alert", back_populates="customer")
 
+    __table_args__ = (
+        Index('idx_customers_raw_data_gin', 'raw_data', postgresql_using='gin', postgresql_ops={'raw_data': 'jsonb_path_ops'}),
+    )
+
 class Alert(Base):
     __tablename__ = "alerts"
 
@@ -61,12 +111,12 @@ class Alert(Base):
     alert_status = Column(String, default="OPN")
     trigger_details = Column(JSON)
     risk_classification = Column(String)
-    risk_score = Column(Integer)
-    run_id = Column(String, ForeignKey("simulation_runs.run_id"), nullable=False, index=True)
+    risk_score = Column(SmallInteger)  # 0-100
+    run_id = Column(String, ForeignKey("simulation_runs.run_id"), nullable=False)  # Indexed via ix_alerts_run_excluded
     excluded = Column(Boolean, default=False)
     exclusion_reason = Column(Text)
-    created_at = Column(DateTime(timezone=True), default=utc_now)  # UTC
-    updated_at = Column(DateTime(timezone=True), default=utc_now, onupdate=utc_now)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())  # UTC
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=utc_now)
 
     # Investigation Workflow
     assigned_to = Column(String, nullable=True) # User ID
@@ -79,6 +129,18 @@ class Alert(Base):
 
     customer = relationship("Customer", back_populates="alerts")
     simulation_run = relationship("SimulationRun", back_populates="alerts")
+
+    __table_args__ = (
+        # Run totals / comparisons: WHERE run_id = ? AND excluded = false (also serves run_id alone)
+        Index('ix_alerts_run_excluded', 'run_id', 'excluded'),
+        # Run comparisons group by customer; INCLUDE lets PG answer them index-only
+        Index('ix_alerts_run_customer', 'run_id', 'customer_id',
+              postgresql_include=['alert_id', 'risk_score', 'scenario_id']),
+        # Per-scenario timelines
+        Index('ix_alerts_scenario_date', 'scenario_id', 'alert_date'),
+        # Open alerts are the hot set (dashboard high-risk count per run)
+        Index('ix_alerts_open', 'run_id', 'risk_classification', postgresql_where=text("alert_status = 'OPN'")),
+    )
     alert_transactions = relationship("AlertTransaction", back_populates="alert")  # ✅ ADDED
 
 class UserProfile(Base):
@@ -127,7 +189,7 @@ class SimulationRun(Base):
     total_transactions = Column(Integer, default=0)
     total_alerts = Column(Integer)
     status = Column(String)
-    progress_percentage = Column(Integer, default=0)
+    progress_percentage = Column(SmallInteger, default=0)
     created_at = Column(DateTime(timezone=False), default=utc_now)
     completed_at = Column(DateTime(timezone=False))
     metadata_info = Column(JSON, nullable=True)
@@ -151,7 +213,7 @@ class AuditLog(Base):
     __tablename__ = "audit_logs"
     
     log_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    timestamp = Column(DateTime, default=utc_now)
+    timestamp = Column(DateTime, server_default=utcnow())
     user_id = Column(String)
     action_type = Column(String) # create_refinement, approve_rule, deploy_rule
     target_entity_id = Column(String) # e.g. scenario_id
@@ -162,9 +224,9 @@ class AuditLog(Base):
 class AlertExclusionLog(Base):
     __tablename__ = "alert_exclusion_logs"
     
-    log_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    log_id = Column(String, primary_key=True, server_default=uuid_text())
     alert_id = Column(String, ForeignKey("alerts.alert_id"))
-    exclusion_timestamp = Column(DateTime, default=utc_now)
+    exclusion_timestamp = Column(DateTime, server_default=utcnow())
     rule_id = Column(String, nullable=True)
     exclusion_reason = Column(String)
     risk_flags = Column(JSON) # Snapshot of risk indicators at time of exclusion
@@ -177,8 +239,8 @@ class CustomerRiskProfile(Base):
     is_pep = Column(Boolean, default=False)
     high_risk_occupation = Column(Boolean, default=False)
     has_adverse_media = Column(Boolean, default=False)
-    previous_sar_count = Column(Integer, default=0)
-    account_age_days = Column(Integer, default=0)
+    previous_sar_count = Column(SmallInteger, default=0)
+    account_age_days = Column(SmallInteger, default=0)  # int2 covers ~89 years
     last_updated = Column(DateTime, default=utc_now)
     
     customer = relationship("Customer")
@@ -195,6 +257,11 @@ class DataUpload(Base):
     expires_at = Column(DateTime(timezone=True))  # Timezone-aware
     status = Column(String, default="active")
 
+    __table_args__ = (
+        # TTL cleanup: WHERE expires_at < now AND status = 'active'
+        Index('idx_data_uploads_active_expiry', 'expires_at', postgresql_where=text("status = 'active'")),
+    )
+
 class Account(Base):
     __tablename__ = "accounts"
 
@@ -320,7 +387,7 @@ class SimulationComparison(Base):
 class BeneficiaryHistory(Base):
     __tablename__ = "beneficiary_history"
     
-    history_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    history_id = Column(String, primary_key=True, server_default=uuid_text())
     beneficiary_name = Column(String, index=True) # Normalized name
     beneficiary_account = Column(String, index=True, nullable=True) # Account/IBAN if available
     
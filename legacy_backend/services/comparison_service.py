@@ -15,13 +15,41 @@ Business Value:
 """
 
 from typing import Dict, List, Any
+from collections import OrderedDict, defaultdict
+import heapq
+from sqlalchemy import select, func, case, cast, and_, Numeric, String
 from sqlalchemy.orm import Session
-from models import Alert, SimulationRun
+from models import Alert, AlertTransaction, SimulationRun, Transaction
 import structlog
 import uuid
 
 logger = structlog.get_logger("comparison_engine")
 
+# Risk score assumed for alerts stored without one (Medium severity)
+DEFAULT_RISK_SCORE = 50
+
+# Values float() accepts, so unparseable amounts count as 0 instead of failing the query
+_NUMBER_PATTERN = r'^\s*[-+]?([0-9]+(\.[0-9]*)?|\.[0-9]+)([eE][-+]?[0-9]+)?\s*$'
+
+
+def _numeric_json(element):
+    """NUMERIC value of a raw_data key, or NULL when it is missing or not a number"""
+    value = cast(element.as_string(), String)
+    return case((value.regexp_match(_NUMBER_PATTERN), cast(value, Numeric)))
+
+
+# Persisted comparisons never change (runs are immutable once complete), so
+# recent results are kept in-process in front of the simulation_comparisons lookup
+COMPARISON_CACHE_SIZE = 512
+_comparison_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+
+def _remember_comparison(key: tuple, result: Dict[str, Any]) -> None:
+    _comparison_cache[key] = result
+    _comparison_cache.move_to_end(key)
+    if len(_comparison_cache) > COMPARISON_CACHE_SIZE:
+        _comparison_cache.popitem(last=False)
+
 
 class ComparisonEngine:
     """
@@ -40,16 +68,31 @@ class ComparisonEngine:
         """
         Main comparison method. Persists results to DB.
         """
-        # 0. Check for existing comparison
+        # 0. Check for existing comparison: process-local LRU first, then the DB
+        cache_key = (baseline_run_id, refined_run_id)
+        cached = _comparison_cache.get(cache_key)
+        if cached is not None:
+            _comparison_cache.move_to_end(cache_key)
+            return cached
+        
         from models import SimulationComparison
-        existing = self.db.query(SimulationComparison).filter(
-            SimulationComparison.base_run_id == baseline_run_id,
-            SimulationComparison.challenger_run_id == refined_run_id
-        ).first()
+        # Only the JSON payload is needed; no SimulationComparison object is built
+        existing_details = self.db.execute(
+            select(SimulationComparison.comparison_details).where(
+                SimulationComparison.base_run_id == baseline_run_id,
+                SimulationComparison.challenger_run_id == refined_run_id,
+                SimulationComparison.comparison_details.isnot(None)
+            ).limit(1)
+        ).scalar()
         
-        if existing and existing.comparison_details:
-            logger.info("comparison_cache_hit", comparison_id=existing.comparison_id)
-            return existing.comparison_details
+        if existing_details:
+            logger.info(
+                "comparison_cache_hit",
+                baseline_run_id=baseline_run_id,
+                refined_run_id=refined_run_id
+            )
+            _remember_comparison(cache_key, existing_details)
+            return existing_details
 
         logger.info(
             "comparison_started",
@@ -57,25 +100,23 @@ class ComparisonEngine:
             refined_run_id=refined_run_id
         )
         
-        # Step 1: Load raw alert sets
-        baseline_alerts = self._load_alerts(baseline_run_id)
-        refined_alerts = self._load_alerts(refined_run_id)
+        # Step 1: Alert counts per run (no ORM rows are loaded)
+        alert_counts = self._count_alerts(baseline_run_id, refined_run_id)
         
         # Step 2: Calculate high-level summary
-        summary = self._calculate_summary(baseline_alerts, refined_alerts)
+        summary = self._calculate_summary(
+            alert_counts.get(baseline_run_id, 0),
+            alert_counts.get(refined_run_id, 0)
+        )
         
-        # Step 3: Granular customer-level diff
+        # Step 3: Granular customer-level diff (aggregated in SQL)
         granular_diff = self._calculate_granular_diff(
-            baseline_alerts, 
-            refined_alerts
+            baseline_run_id, 
+            refined_run_id
         )
         
         # Step 4: Risk analysis (red-teaming)
-        risk_analysis = self._analyze_risk(
-            baseline_alerts,
-            refined_alerts,
-            granular_diff
-        )
+        risk_analysis = self._analyze_risk(granular_diff)
         
         result_json = {
             "summary": summary,
@@ -104,38 +145,34 @@ class ComparisonEngine:
             )
             self.db.add(comparison_record)
             self.db.commit()
+            _remember_comparison(cache_key, result_json)
         except Exception as e:
             logger.error("comparison_persist_failed", error=str(e))
             self.db.rollback()
         
         return result_json
     
-    def _load_alerts(self, run_id: str) -> List[Alert]:
+    def _count_alerts(self, *run_ids: str) -> Dict[str, int]:
         """
-        Load all alerts for a given run.
+        Count alerts per run in one grouped query.
         
-        Args:
-            run_id: Simulation run ID
-            
         Returns:
-            List of Alert objects
+            {run_id: alert_count} (runs without alerts are absent)
         """
-        alerts = self.db.query(Alert).filter(
-            Alert.run_id == run_id
+        rows = self.db.execute(
+            select(Alert.run_id, func.count())
+            .where(Alert.run_id.in_(run_ids))
+            .group_by(Alert.run_id)
         ).all()
         
-        logger.debug(
-            "alerts_loaded",
-            run_id=run_id,
-            count=len(alerts)
-        )
-        
-        return alerts
+        counts = dict(rows)
+        logger.debug("alerts_counted", counts=counts)
+        return counts
     
     def _calculate_summary(
         self, 
-        baseline_alerts: List[Alert], 
-        refined_alerts: List[Alert]
+        baseline_count: int, 
+        refined_count: int
     ) -> Dict[str, Any]:
         """
         Calculate high-level reduction metrics.
@@ -148,8 +185,6 @@ class ComparisonEngine:
                 "percent_reduction": float
             }
         """
-        baseline_count = len(baseline_alerts)
-        refined_count = len(refined_alerts)
         net_change = baseline_count - refined_count
         
         # Handle edge case: no baseline alerts
@@ -167,110 +202,106 @@ class ComparisonEngine:
     
     def _calculate_granular_diff(
         self,
-        baseline_alerts: List[Alert],
-        refined_alerts: List[Alert],
+        baseline_run_id: str,
+        refined_run_id: str,
         limit: int = 50
     ) -> List[Dict[str, Any]]:
         """
-        Calculate customer-level granular diff with optimized transaction loading.
+        Calculate customer-level granular diff.
+        
+        Customers alerted in the baseline but absent from the refined run are
+        aggregated in SQL (anti-join + GROUP BY), so only the top `limit`
+        customers are returned to Python.
         """
-        from models import Transaction
+        # Sum of the triggering transaction amounts per baseline alert
+        alert_amounts = (
+            select(
+                AlertTransaction.alert_id,
+                func.sum(_numeric_json(Transaction.raw_data['transaction_amount'])).label("amount")
+            )
+            # transactions is keyed by (transaction_id, upload_id); joining on the
+            # ID alone would repeat an amount once per upload reusing that ID
+            .join(Transaction, and_(
+                Transaction.transaction_id == AlertTransaction.transaction_id,
+                Transaction.upload_id == AlertTransaction.upload_id
+            ))
+            .join(Alert, Alert.alert_id == AlertTransaction.alert_id)
+            .where(Alert.run_id == baseline_run_id)
+            .group_by(AlertTransaction.alert_id)
+            .subquery()
+        )
         
-        # Extract customer IDs
-        baseline_customers = set(alert.customer_id for alert in baseline_alerts)
-        refined_customers = set(alert.customer_id for alert in refined_alerts)
-        removed_customers = baseline_customers - refined_customers
+        refined_customers = (
+            select(Alert.customer_id)
+            .where(Alert.run_id == refined_run_id)
+            .group_by(Alert.customer_id)
+            .subquery()
+        )
         
-        # ✅ BATCH LOAD ALL TRANSACTIONS ONCE
-        all_transaction_ids = set()
-        for alert in baseline_alerts:
-            # Use relationship: alert.alert_transactions (list of AlertTransaction objects)
-            if alert.alert_transactions:
-                for at in alert.alert_transactions:
-                    all_transaction_ids.add(at.transaction_id)
+        # Alerts without a score fall back to the Medium severity estimate
+        max_risk_score = func.max(
+            func.coalesce(func.nullif(Alert.risk_score, 0), DEFAULT_RISK_SCORE)
+        ).label("max_risk_score")
         
-        # Single DB query for all transactions
-        transactions_map = {}
-        if all_transaction_ids:
-            transactions = self.db.query(Transaction).filter(
-                Transaction.transaction_id.in_(all_transaction_ids)
-            ).all()
-            
-            transactions_map = {
-                txn.transaction_id: txn for txn in transactions
-            }
+        query = (
+            select(
+                Alert.customer_id,
+                func.count().label("alert_count"),
+                func.coalesce(func.sum(alert_amounts.c.amount), 0).label("total_amount"),
+                max_risk_score
+            )
+            .outerjoin(alert_amounts, alert_amounts.c.alert_id == Alert.alert_id)
+            .outerjoin(refined_customers, refined_customers.c.customer_id == Alert.customer_id)
+            .where(
+                Alert.run_id == baseline_run_id,
+                refined_customers.c.customer_id.is_(None)
+            )
+            .group_by(Alert.customer_id)
+            # Sort by risk score (highest first)
+            .order_by(max_risk_score.desc(), Alert.customer_id)
+        )
+        if limit:
+            query = query.limit(limit)
         
-        # Build granular diff
-        granular_diff = []
+        rows = self.db.execute(query).all()
+        if not rows:
+            return []
         
-        for customer_id in removed_customers:
-            customer_alerts = [
-                alert for alert in baseline_alerts 
-                if alert.customer_id == customer_id
-            ]
-            
-            alert_count = len(customer_alerts)
-            
-            # ✅ CALCULATE AMOUNT USING PRE-LOADED TRANSACTIONS
-            total_amount = 0.0
-            for alert in customer_alerts:
-                if alert.alert_transactions:
-                    for at in alert.alert_transactions:
-                        txn_id = at.transaction_id
-                        txn = transactions_map.get(txn_id)
-                        if txn:
-                            try:
-                                amount = txn.raw_data.get('transaction_amount', 0)
-                                total_amount += float(amount)
-                            except (ValueError, TypeError):
-                                pass
-            
-            # Get highest risk score
-            max_risk_score = 0
-            for alert in customer_alerts:
-                if hasattr(alert, 'risk_score') and alert.risk_score:
-                    max_risk_score = max(max_risk_score, alert.risk_score)
-                else:
-                    severity_map = {
-                        'Critical': 90,
-                        'High': 75,
-                        'Medium': 50,
-                        'Low': 25
-                    }
-                    max_risk_score = max(
-                        max_risk_score, 
-                        severity_map.get(alert.severity, 50)
-                    )
-            
-            granular_diff.append({
-                "customer_id": customer_id,
-                "status": "removed",
-                "alert_count": alert_count,
-                "total_amount": round(total_amount, 2),
-                "max_risk_score": round(max_risk_score, 2),
-                "scenarios": list(set(
-                    alert.scenario_id for alert in customer_alerts 
-                    if hasattr(alert, 'scenario_id') and alert.scenario_id
-                ))
-            })
+        # Scenarios only for the customers being returned
+        scenarios = defaultdict(list)
+        scenario_rows = self.db.execute(
+            select(Alert.customer_id, Alert.scenario_id)
+            .where(
+                Alert.run_id == baseline_run_id,
+                Alert.customer_id.in_([row.customer_id for row in rows]),
+                Alert.scenario_id.isnot(None)
+            )
+            .distinct()
+        ).all()
+        for customer_id, scenario_id in scenario_rows:
+            scenarios[customer_id].append(scenario_id)
         
-        # Sort by risk score (highest first)
-        granular_diff.sort(key=lambda x: x["max_risk_score"], reverse=True)
+        granular_diff = [
+            {
+                "customer_id": row.customer_id,
+                "status": "removed",
+                "alert_count": row.alert_count,
+                "total_amount": round(float(row.total_amount), 2),
+                "max_risk_score": round(row.max_risk_score, 2),
+                "scenarios": scenarios[row.customer_id]
+            }
+            for row in rows
+        ]
         
         logger.info(
             "granular_diff_calculated",
-            removed_customers=len(removed_customers),
             total_diff=len(granular_diff)
         )
         
-        if limit:
-            return granular_diff[:limit]
         return granular_diff
     
     def _analyze_risk(
         self,
-        baseline_alerts: List[Alert],
-        refined_alerts: List[Alert],
         granular_diff: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """
@@ -287,11 +318,8 @@ class ComparisonEngine:
             risk_score = 0.0
             risk_level = "SAFE"
         else:
-            # Average of top 10 risk scores
-            top_risks = sorted(
-                [item["max_risk_score"] for item in granular_diff],
-                reverse=True
-            )[:10]
+            # Average of top 10 risk scores (partial selection, no full sort)
+            top_risks = heapq.nlargest(10, (item["max_risk_score"] for item in granular_diff))
             risk_score = sum(top_risks) / len(top_risks) if top_risks else 0.0
             
             # Classify risk level - stricter since everything is critical
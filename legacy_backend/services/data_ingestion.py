@@ -1,11 +1,74 @@
 import pandas as pd
 import numpy as np
-from pydantic import BaseModel, ValidationError, validator
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from pydantic import BaseModel
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional, List
+from typing import Optional, List, Iterator, Mapping
+from collections import Counter
+from functools import lru_cache
+from types import MappingProxyType
+import csv
 import io
+import os
+import re
+import uuid
 
+# Rows converted to pandas/raw_data at a time; bounds the object-heavy working set
+INGEST_CHUNK_ROWS = 50_000
+
+# Bytes per PyArrow CSV parse block (blocks are parsed in parallel)
+INGEST_BLOCK_BYTES = 16 << 20
+
+# Text columns with at most this many distinct values are dictionary-encoded
+DICT_MAX_CARDINALITY = 1024
+
+# Best-effort header mappings (canonical header -> field), shared read-only across calls
+TRANSACTION_HEADER_MAPPING = MappingProxyType({
+    'id': 'transaction_id',
+    'txn_id': 'transaction_id',
+    'transaction_id': 'transaction_id',
+    'ref': 'transaction_id',
+    'date': 'transaction_date',
+    'txn_date': 'transaction_date',
+    'transaction_date': 'transaction_date',
+    'amount': 'transaction_amount',
+    'txn_amt': 'transaction_amount',
+    'transaction_amount': 'transaction_amount',
+    'cust_id': 'customer_id',
+    'customer_id': 'customer_id',
+    'client_id': 'customer_id',
+    'indicator': 'debit_credit_indicator',
+    'dc': 'debit_credit_indicator',
+    'd/c': 'debit_credit_indicator',
+})
+
+CUSTOMER_HEADER_MAPPING = MappingProxyType({
+    'cust_id': 'customer_id',
+    'customer_id': 'customer_id',
+    'client_id': 'customer_id',
+    'id': 'customer_id',
+})
+
+# Every date format we accept has a digit in it; a sample without one can't parse
+_HAS_DIGIT = re.compile(r'\d')
+
+
+@lru_cache(maxsize=4096)
+def _parse_decimal(text: str) -> Decimal:
+    """Decimal from a raw_data string; repeated values (e.g. zero balances) hit the cache"""
+    return Decimal(text)
+
+
+def _batched_uuid4(count: int) -> Iterator[str]:
+    """`count` random (version 4) UUID strings drawn from a single os.urandom call"""
+    rand = os.urandom(16 * count)
+    return (str(uuid.UUID(bytes=rand[i:i + 16], version=4)) for i in range(0, len(rand), 16))
+
+# Record shapes for reference only: ingestion checks the required ID columns
+# column-wise (see _split_id_columns) instead of building a model per row.
 # IDs are now mandatory again as they are PKs
 class TransactionSchema(BaseModel):
     transaction_id: str
@@ -32,189 +95,276 @@ class CustomerSchema(BaseModel):
     raw_data: Optional[dict] = None
 
 class DataIngestionService:
-    def _read_file(self, file_content: bytes, filename: str) -> pd.DataFrame:
+    def _read_chunks(self, file_content: bytes, filename: str) -> Iterator[pd.DataFrame]:
+        """
+        Parse the upload once, then yield it as frames of at most INGEST_CHUNK_ROWS
+        rows. Only the current chunk is held as pandas/Python objects; each frame
+        is indexed by its position in the file so row numbers stay absolute.
+        """
         if filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(file_content))
+            # Multithreaded Arrow parse with every column read as text, so a
+            # value late in the file can't break a type guessed from the first
+            # block; types are then inferred over whole columns. Quoted cells
+            # may span lines, so the block chunker must respect quoting
+            header = next(csv.reader(io.TextIOWrapper(io.BytesIO(file_content), encoding='utf-8-sig', newline='')), [])
+            table = pacsv.read_csv(
+                io.BytesIO(file_content),
+                read_options=pacsv.ReadOptions(
+                    use_threads=True, block_size=INGEST_BLOCK_BYTES, column_names=header, skip_rows=1
+                ),
+                parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={name: pa.string() for name in header},
+                    strings_can_be_null=True,
+                ),
+            )
+            table = self._infer_column_types(table)
+            # The Arrow table stays columnar; pandas conversion happens per slice
+            for offset in range(0, table.num_rows, INGEST_CHUNK_ROWS):
+                df = table.slice(offset, INGEST_CHUNK_ROWS).to_pandas()
+                df.index = pd.RangeIndex(offset, offset + len(df))
+                yield self._prepare_frame(df)
         elif filename.endswith(('.xls', '.xlsx')):
             df = pd.read_excel(io.BytesIO(file_content))
+            for offset in range(0, len(df), INGEST_CHUNK_ROWS):
+                yield self._prepare_frame(df.iloc[offset:offset + INGEST_CHUNK_ROWS].copy())
         else:
             raise ValueError("Unsupported file format")
-            
-        # Robust Cleaning: Replace Inf/-Inf with NaN, then all NaN with None
-        df = df.replace([np.inf, -np.inf], np.nan)
-        # Cast to object to allow None replacement for numeric columns
-        df = df.astype(object)
-        df = df.where(pd.notnull(df), None)
+
+    def _infer_column_types(self, table: pa.Table) -> pa.Table:
+        """
+        Type an all-text CSV table column by column over the whole file.
+        
+        Like pd.read_csv, a column becomes int64, else float64, only when every
+        non-null value parses; anything else stays text. Integer columns with
+        nulls become float64 as in pd.read_csv, so every chunk of the column
+        converts to the same pandas dtype. Dates are not parsed,
+        so raw_data keeps the user's own text. Low-cardinality text columns are
+        dictionary-encoded and convert straight to pandas categoricals.
+        """
+        columns = []
+        for column in table.columns:
+            targets = (pa.int64(), pa.float64()) if column.null_count == 0 else (pa.float64(),)
+            for target in targets:
+                try:
+                    column = pc.cast(column, target)
+                    break
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    continue
+            else:
+                if pc.count_distinct(column).as_py() <= DICT_MAX_CARDINALITY:
+                    column = column.dictionary_encode()
+            columns.append(column)
+        return pa.Table.from_arrays(columns, names=table.column_names)
+
+    def _prepare_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Canonical headers (lowercase, underscored) on every chunk, so the
+        # processing steps can match column names directly.
+        df.columns = [str(c).lower().strip().replace(' ', '_') for c in df.columns]
+        
+        # Columns keep their native dtypes; NaN is only turned into "missing"
+        # when raw_data is serialized.
+        return self._shrink_dtypes(df)
+
+    def _shrink_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Downcast integer columns and store low-cardinality text columns as category.
+        Floats are left at float64 so amounts keep their full precision; Inf/-Inf
+        become NaN, rewriting only float columns that actually contain them.
+        """
+        for pos in range(df.shape[1]):
+            col = df.iloc[:, pos]
+            if pd.api.types.is_float_dtype(col.dtype):
+                values = col.to_numpy()
+                if np.isinf(values).any():
+                    df.isetitem(pos, col.where(~np.isinf(values)))
+                continue
+            kind = pd.api.types.infer_dtype(col, skipna=True)
+            if kind == 'integer':
+                df.isetitem(pos, pd.to_numeric(col, downcast='integer'))
+            elif kind == 'string' and len(df) and col.nunique() / len(df) < 0.5:
+                df.isetitem(pos, col.astype('category'))
         return df
 
     def process_transactions_csv(self, file_content: bytes, filename: str = "data.csv", upload_id: str = None) -> tuple[List[dict], List[dict], dict]:
-        df = self._read_file(file_content, filename)
-        
         # ✅ Generate upload_id and prefix EARLY
         import uuid
         if upload_id is None:
             upload_id = str(uuid.uuid4())
         upload_prefix = upload_id[:8]  # First 8 chars for prefix
         
-        # Best-effort header mapping
-        mapping = {
-            'id': 'transaction_id',
-            'txn_id': 'transaction_id',
-            'transaction_id': 'transaction_id',
-            'ref': 'transaction_id',
-            'date': 'transaction_date',
-            'txn_date': 'transaction_date',
-            'transaction_date': 'transaction_date',
-            'amount': 'transaction_amount',
-            'txn_amt': 'transaction_amount',
-            'transaction_amount': 'transaction_amount',
-            'cust_id': 'customer_id',
-            'customer_id': 'customer_id',
-            'client_id': 'customer_id',
-            'indicator': 'debit_credit_indicator',
-            'dc': 'debit_credit_indicator',
-            'd/c': 'debit_credit_indicator',
-        }
-        
         valid_records = []
         errors = []
-        
-        for idx, row in enumerate(df.to_dict(orient='records')):
-            try:
-                # ✅ STEP 1: Build raw_data, excluding ID fields to avoid duplicates
-                raw_data = {}
-                original_customer_id = None
-                original_transaction_id = None
-                
-                for k, v in row.items():
-                    clean_k = str(k).lower().strip().replace(' ', '_')
-                    target_k = mapping.get(clean_k, clean_k)
-                    
-                    # ✅ Extract and skip ID fields (they're table columns, not raw_data)
-                    if target_k == 'customer_id':
-                        original_customer_id = str(v)
-                        continue  # Don't add to raw_data
-                    elif target_k == 'transaction_id':
-                        original_transaction_id = str(v)
-                        continue  # Don't add to raw_data
-                    
-                    # Add all other fields to raw_data
-                    if v is not None:  # Skip None/NaN
-                        # Convert types for JSON serialization
-                        if isinstance(v, (np.integer, np.floating)):
-                            raw_data[clean_k] = float(v) if isinstance(v, np.floating) else int(v)
-                        elif isinstance(v, pd.Timestamp):
-                            raw_data[clean_k] = v.isoformat()
-                        elif isinstance(v, Decimal):
-                            raw_data[clean_k] = float(v)
-                        else:
-                            raw_data[clean_k] = str(v)
-                
-                # ✅ Store original IDs separately in raw_data
-                if original_customer_id:
-                    raw_data['original_customer_id'] = original_customer_id
-                if original_transaction_id:
-                    raw_data['original_transaction_id'] = original_transaction_id
-                
-                # Validate required fields exist
-                if not original_transaction_id or not original_customer_id:
-                    raise ValueError(f"Missing required fields: transaction_id or customer_id")
-                
-                # ✅ STEP 2: Build processed_row with prefixed customer_id
-                processed_row = {
-                    'transaction_id': original_transaction_id,
-                    'customer_id': f"{upload_prefix}_{original_customer_id}",
+        field_counts = {}
+        for df in self._read_chunks(file_content, filename):
+            # ✅ Pull the ID columns out of raw_data
+            values, ids = self._split_id_columns(df, TRANSACTION_HEADER_MAPPING, ['customer_id', 'transaction_id'])
+            raw_records, text_columns = self._to_raw_data(values)
+            customer_ids = ids['customer_id']
+            transaction_ids = ids['transaction_id']
+            
+            # Validate required fields exist
+            missing = (customer_ids.isna() | transaction_ids.isna()).to_numpy()
+            errors.extend(
+                {"row": int(row) + 2, "error": "Missing required fields: transaction_id or customer_id"}
+                for row in df.index[missing]
+            )
+            
+            # ✅ Build processed rows with prefixed customer_id; original IDs kept in raw_data
+            valid_records.extend(
+                {
+                    'transaction_id': txn_id,
+                    'customer_id': f"{upload_prefix}_{cust_id}",
                     'upload_id': upload_id,
-                    'raw_data': raw_data
+                    'raw_data': {**raw_data, 'original_customer_id': cust_id, 'original_transaction_id': txn_id}
                 }
-                
-                valid_records.append(processed_row)
-                
-            except Exception as e:
-                errors.append({"row": idx + 2, "error": str(e)})
+                for txn_id, cust_id, raw_data, is_missing in zip(transaction_ids, customer_ids, raw_records, missing)
+                if not is_missing
+            )
+            
+            # Count field values for the index in the same pass over the chunk
+            self._count_field_values(field_counts, {
+                **text_columns,
+                'original_customer_id': customer_ids.to_numpy(),
+                'original_transaction_id': transaction_ids.to_numpy(),
+            }, ~missing)
         
-        # Build field index from raw_data
-        computed_index = self._build_field_index(valid_records, 'transactions')
+        # Build field index from the raw_data value counts
+        computed_index = self._build_field_index(field_counts, len(valid_records))
         
         return valid_records, errors, computed_index
         
     def process_customers_csv(self, file_content: bytes, filename: str = "data.csv", upload_id: str = None) -> tuple[List[dict], List[dict], dict, List[dict]]:
-        df = self._read_file(file_content, filename)
-        
         # ✅ Generate upload_id and prefix EARLY
         import uuid
         if upload_id is None:
             upload_id = str(uuid.uuid4())
         upload_prefix = upload_id[:8]  # First 8 chars for prefix
         
-        mapping = {
-            'cust_id': 'customer_id',
-            'customer_id': 'customer_id',
-            'client_id': 'customer_id',
-            'id': 'customer_id',
-        }
-        
         valid_records = []
         errors = []
-        
-        for idx, row in enumerate(df.to_dict(orient='records')):
-            try:
-                # ✅ Build raw_data, excluding customer_id to avoid duplicates
-                raw_data = {}
-                original_customer_id = None
-                
-                for k, v in row.items():
-                    clean_k = str(k).lower().strip().replace(' ', '_')
-                    target_k = mapping.get(clean_k, clean_k)
-                    
-                    # ✅ Extract and skip customer_id (it's a table column)
-                    if target_k == 'customer_id':
-                        original_customer_id = str(v)
-                        continue  # Don't add to raw_data
-                    
-                    # Add all other fields to raw_data
-                    if v is not None:
-                        if isinstance(v, (np.integer, np.floating)):
-                            raw_data[clean_k] = float(v) if isinstance(v, np.floating) else int(v)
-                        elif isinstance(v, pd.Timestamp):
-                            raw_data[clean_k] = v.isoformat()
-                        elif isinstance(v, Decimal):
-                            raw_data[clean_k] = float(v)
-                        else:
-                            raw_data[clean_k] = str(v)
-                
-                # ✅ Store original customer_id in raw_data
-                if original_customer_id:
-                    raw_data['original_customer_id'] = original_customer_id
-                else:
-                    raise ValueError("Missing customer_id")
-                
-                # Build processed_row with prefixed customer_id
-                processed_row = {
-                    'customer_id': f"{upload_prefix}_{original_customer_id}",
+        field_counts = {}
+        for df in self._read_chunks(file_content, filename):
+            # ✅ Pull customer_id out of raw_data
+            values, ids = self._split_id_columns(df, CUSTOMER_HEADER_MAPPING, ['customer_id'])
+            raw_records, text_columns = self._to_raw_data(values)
+            customer_ids = ids['customer_id']
+            
+            missing = customer_ids.isna().to_numpy()
+            errors.extend({"row": int(row) + 2, "error": "Missing customer_id"} for row in df.index[missing])
+            
+            # Build processed rows with prefixed customer_id; original ID kept in raw_data
+            valid_records.extend(
+                {
+                    'customer_id': f"{upload_prefix}_{cust_id}",
                     'upload_id': upload_id,
-                    'raw_data': raw_data
+                    'raw_data': {**raw_data, 'original_customer_id': cust_id}
                 }
-                
-                valid_records.append(processed_row)
-                
-            except Exception as e:
-                errors.append({"row": idx + 2, "error": str(e)})
+                for cust_id, raw_data, is_missing in zip(customer_ids, raw_records, missing)
+                if not is_missing
+            )
+            
+            self._count_field_values(field_counts, {
+                **text_columns,
+                'original_customer_id': customer_ids.to_numpy(),
+            }, ~missing)
         
-        computed_index = self._build_field_index(valid_records, 'customers')
+        computed_index = self._build_field_index(field_counts, len(valid_records))
         extracted_accounts = self._extract_accounts_from_customers(valid_records, upload_id, upload_prefix)
         
         return valid_records, errors, computed_index, extracted_accounts
 
+    def _split_id_columns(self, df: pd.DataFrame, mapping: Mapping[str, str], id_fields: List[str]) -> tuple[pd.DataFrame, dict]:
+        """
+        Separate the ID columns from the raw_data columns.
+        
+        Expects the canonical headers produced by _read_chunks; `mapping` is only
+        used to recognise ID columns, other columns keep their name. Returns
+        the remaining value columns and, per ID field, a Series of string IDs
+        (None where the value is missing or empty).
+        """
+        targets = [mapping.get(c, c) for c in df.columns]
+        
+        ids = {}
+        for field in id_fields:
+            positions = [i for i, target in enumerate(targets) if target == field]
+            if not positions:
+                ids[field] = pd.Series(None, index=df.index, dtype=object)
+                continue
+            # Last matching column wins, as with the old per-row dict build
+            col = df.iloc[:, positions[-1]]
+            as_str = col.astype(str).astype(object)  # object keeps None as None
+            ids[field] = as_str.where(col.notna() & (as_str != ''), None)
+        
+        values = df.iloc[:, [i for i, target in enumerate(targets) if target not in id_fields]]
+        values = values.loc[:, ~values.columns.duplicated(keep='last')]
+        return values, ids
+
+    def _to_raw_data(self, values: pd.DataFrame) -> tuple[List[dict], dict]:
+        """
+        Serialize value columns to JSON-safe raw_data dicts in one columnar pass.
+        Values are stored as strings (timestamps as ISO-8601); nulls are skipped.
+        Also returns the string columns (name -> object array, None for nulls)
+        so the caller can count field values without re-reading the dicts.
+        """
+        values = values.infer_objects()
+        names = list(values.columns)
+        arrays = []
+        for col in names:
+            series = values[col]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                text = series.map(lambda ts: ts.isoformat(), na_action='ignore')
+            else:
+                text = series.astype(str)
+            # object dtype so missing values stay None (a str dtype would turn them into NaN)
+            arrays.append(text.astype(object).where(series.notna(), None).to_numpy())
+        
+        # One object array per column; rows are zipped straight into the final
+        # dicts, skipping the intermediate all-columns record dicts
+        records = [
+            {name: value for name, value in zip(names, row) if value is not None}
+            for row in zip(*arrays)
+        ] if arrays else [{} for _ in range(len(values))]
+        return records, dict(zip(names, arrays))
+
+    def _count_field_values(self, field_counts: dict, columns: dict, keep: np.ndarray) -> None:
+        """
+        Add one chunk's string columns (rows selected by `keep`) to the running
+        per-field Counters. None and empty strings are not counted; a field is
+        only indexed once some kept row has a value for it.
+        """
+        for field_name, column in columns.items():
+            present = pd.Series(column[keep], dtype=object).dropna()
+            if present.empty:
+                continue
+            # C-level counting, in first-seen order; Counter keeps that order across chunks
+            value_counts = present[present != ''].value_counts(sort=False)
+            field_counts.setdefault(field_name, Counter()).update(
+                dict(zip(value_counts.index.tolist(), value_counts.tolist()))
+            )
+
     def _extract_accounts_from_customers(self, customer_records: List[dict], upload_id: str, upload_prefix: str) -> List[dict]:
         """
         Generates master Account records from Customer data.
         """
         accounts = []
-        import uuid
         from datetime import datetime
         
-        for cust in customer_records:
+        # Random fallback account IDs for customers without account_id/account_number,
+        # generated in one batch rather than a uuid4() per customer
+        fallback_ids = _batched_uuid4(sum(
+            1 for cust in customer_records
+            if not (cust.get('raw_data', {}).get('account_id') or cust.get('raw_data', {}).get('account_number'))
+        ))
+        
+        # One vectorized parse of every open_date (naive UTC, NaT where missing or
+        # unparseable) instead of a pd.to_datetime call per customer
+        open_dates = pd.to_datetime(
+            pd.Series([cust.get('raw_data', {}).get('open_date') for cust in customer_records], dtype=object),
+            errors='coerce', format='mixed', utc=True,
+        ).dt.tz_convert(None)
+        
+        for cust, open_date in zip(customer_records, open_dates.tolist()):
             # We assume 1 customer row = 1 primary account for now
             # In real world, one customer can have multiple accounts (master-detail),
             # but usually the CSV is flattened.
@@ -228,7 +378,7 @@ class DataIngestionService:
             acc_num = raw.get('account_number')
             
             # Generate account_id from raw data or create new
-            original_account_id = raw.get('account_id') or raw.get('account_number') or str(uuid.uuid4())
+            original_account_id = raw.get('account_id') or raw.get('account_number') or next(fallback_ids)
             
             # Basic Account Dict
             account_data = {
@@ -250,12 +400,11 @@ class DataIngestionService:
             }
             
             # Try to populate more fields from raw_data if available
-            if 'open_date' in raw:
-                try: account_data['account_open_date'] = pd.to_datetime(raw['open_date'])
-                except: pass
+            if not pd.isna(open_date):
+                account_data['account_open_date'] = open_date
             
             if 'balance' in raw:
-                try: account_data['current_balance'] = Decimal(str(raw['balance']))
+                try: account_data['current_balance'] = _parse_decimal(raw['balance'])  # raw_data values are str
                 except: pass
                 
             if 'risk_rating' in raw:
@@ -268,70 +417,43 @@ class DataIngestionService:
             
         return accounts
 
-    def _build_field_index(self, records: List[dict], table_name: str) -> dict:
+    def _build_field_index(self, field_counts: dict, total_records: int) -> dict:
         """
-        Extract all unique field values and build searchable index stats.
+        Build searchable index stats from the per-field value Counters collected
+        during ingestion (see _count_field_values).
         Returns a dict structure to be used for creating FieldMetadata and FieldValueIndex.
         """
-        from collections import Counter
-        
-        # Group records by field
-        field_values = {}  # {field_name: {value: count}}
-        field_samples = {} # {field_name: [sample_values]}
-        
-        for record in records:
-            # We index data from 'raw_data' (dynamic fields) AND specific core columns users filter on.
-            # Core columns to index:
-            core_cols = []
-            if table_name == 'transactions':
-                core_cols = ['transaction_type', 'channel', 'debit_credit_indicator', 'beneficiary_bank']
-            elif table_name == 'customers':
-                core_cols = ['customer_type', 'occupation', 'account_type']
-            
-            # Combine raw_data and core columns
-            data_to_index = record.get('raw_data', {}).copy()
-            for col in core_cols:
-                if record.get(col):
-                    data_to_index[col] = record.get(col)
-            
-            for field_name, field_value in data_to_index.items():
-                if field_name not in field_values:
-                    field_values[field_name] = Counter()
-                
-                # Convert to string for indexing, but keep None as None
-                str_value = str(field_value) if field_value is not None else None
-                if str_value:
-                    field_values[field_name][str_value] += 1
-        
-        # Build Index Result
         index_result = {}
-        total_records = len(records)
         
-        for field_name, value_counts in field_values.items():
-            field_type = self._infer_field_type(list(value_counts.keys()))
-            distinct_count = len(value_counts)
+        for field_name, counts in field_counts.items():
+            distinct_values = list(counts)
+            
+            field_type = self._infer_field_type(distinct_values[:100])
+            distinct_count = len(counts)
+            non_null_count = sum(counts.values())
             
             metadata = {
                 "field_name": field_name,
                 "field_type": field_type,
                 "total_records": total_records,
-                "non_null_count": sum(value_counts.values()),
-                "null_count": total_records - sum(value_counts.values()),
+                "non_null_count": non_null_count,
+                "null_count": total_records - non_null_count,
                 "distinct_count": distinct_count,
                 "recommended_operators": self._get_recommended_operators(field_type),
-                "sample_values": list(value_counts.keys())[:10]
+                "sample_values": distinct_values[:10]
             }
             
             values = []
             # Build value index (only if distinct values < 1000)
             if distinct_count < 1000:  # Don't index high-cardinality fields
-                for value, count in value_counts.items():
-                    percentage = (count / total_records) * 100
-                    values.append({
+                values = [
+                    {
                         "field_value": value,
                         "value_count": count,
-                        "value_percentage": round(percentage, 2)
-                    })
+                        "value_percentage": round(count / total_records * 100, 2)
+                    }
+                    for value, count in counts.items()
+                ]
             
             index_result[field_name] = {
                 "metadata": metadata,
@@ -345,22 +467,22 @@ class DataIngestionService:
         samples = sample_values[:100]
         if not samples: return 'text'
         
-        # Check if all values are numeric
-        try:
-            [float(v) for v in samples]
+        values = pd.Series(samples, dtype=object)
+        
+        # Check if all values are numeric (one vectorized parse, no per-value float())
+        if pd.to_numeric(values, errors='coerce').notna().all():
             return 'numeric'
-        except:
-            pass
         
-        # Check if all values are dates (simple check)
-        # Using pandas to datetime is robust but slow for many checks. 
-        # For ingestion, reliability > speed here.
+        # Check if all values are dates: one to_datetime call over the samples;
+        # format='mixed' parses each value on its own like the old per-value loop.
+        # Be strict for now: any value that fails to parse makes it text, so a
+        # first sample without digits (plain text columns) skips the parse.
         try:
-            # Only checking if *valid* samples parse. If it fails, it's text.
-             # We assume if 90% parse, it's date? No, be strict for now.
-            [pd.to_datetime(v) for v in samples]
-            return 'date'
-        except:
+            if _HAS_DIGIT.search(str(samples[0])) and pd.to_datetime(
+                values, errors='coerce', format='mixed', utc=True
+            ).notna().all():
+                return 'date'
+        except (ValueError, TypeError, OverflowError):
             pass
         
         # Check if boolean
@@ -1,6 +1,17 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, JSON, Uuid, func, cast, insert
+from sqlalchemy.dialects.postgresql import JSONB
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import io
+import os
+import csv
+import json
+import orjson
 import uuid
 from typing import List, Dict, Set, Optional
 from decimal import Decimal
@@ -13,6 +24,9 @@ from core.universal_engine import UniversalScenarioEngine
 from core.config_models import ScenarioConfigModel
 from core.field_mapper import apply_field_mappings_to_df
 
+# Upper bound on scenarios executed concurrently within one batch
+SCENARIO_WORKERS = int(os.getenv("SIMULATION_SCENARIO_WORKERS", str(os.cpu_count() or 1)))
+
 
 class SimulationService:
     """
@@ -79,26 +93,38 @@ class SimulationService:
         self.db.commit()
         return run
 
+    # System columns to keep from database query
+    SYSTEM_COLUMNS = ['customer_id', 'transaction_id', 'upload_id', 'created_at', 'expires_at']
+
     def _flatten_raw_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Extracts raw_data JSONB into DataFrame columns.
+        Client-side fallback for databases that cannot flatten in SQL.
         """
         if df.empty or 'raw_data' not in df.columns:
             return df
         
-        # Extract raw_data JSONB into columns
-        meta_df = pd.json_normalize(df['raw_data'])
+        # Extract raw_data JSONB into columns. raw_data is a flat dict of strings,
+        # so build one list per key directly instead of json_normalize's
+        # recursive record walk (keys keep first-seen order)
+        records = [raw if isinstance(raw, dict) else {} for raw in df['raw_data']]
+        keys = dict.fromkeys(key for raw in records for key in raw)
+        meta_df = pd.DataFrame({key: [raw.get(key) for raw in records] for key in keys}, index=df.index)
         
         if meta_df.empty:
             return df.drop(columns=['raw_data'])
         
-        # System columns to keep from database query
-        system_cols = ['customer_id', 'transaction_id', 'upload_id', 'created_at', 'expires_at']
-        df_system = df[[col for col in system_cols if col in df.columns]]
+        df_system = df[[col for col in self.SYSTEM_COLUMNS if col in df.columns]]
         
         # Combine: system columns (from DB) + user data (from raw_data JSONB)
         result = pd.concat([df_system, meta_df], axis=1)
         
+        print(f"[DATA_FLATTEN] Loaded {len(meta_df.columns)} fields from raw_data")
+        
+        return self._parse_flat_columns(result)
+
+    def _parse_flat_columns(self, result: pd.DataFrame) -> pd.DataFrame:
+        """Parse well-known date and numeric fields of flattened raw_data"""
         # ✅ FIX: Parse date columns
         date_columns = ['transaction_date', 'account_opening_date', 'date_of_birth', 'created_date']
         for col in date_columns:
@@ -114,10 +140,135 @@ class SimulationService:
             if col in result.columns:
                 result[col] = pd.to_numeric(result[col], errors='coerce')
         
-        print(f"[DATA_FLATTEN] Loaded {len(meta_df.columns)} fields from raw_data")
-        
         return result
 
+    def _load_flat_df(self, query, model) -> pd.DataFrame:
+        """
+        Load a Customer/Transaction query with raw_data already flattened.
+        
+        On PostgreSQL the distinct raw_data keys are looked up first and each
+        one is selected as raw_data->>'key', so the database returns flat
+        text columns and no JSON is parsed client-side. Keys that clash with
+        a system column are skipped, as the system column wins either way.
+        Other dialects load raw_data and flatten it in pandas.
+        """
+        if self.db.get_bind().dialect.name != 'postgresql':
+            return self._flatten_raw_data(self._read_query_df(query))
+        
+        raw = cast(model.raw_data, JSONB)
+        keys = [
+            row[0] for row in
+            query.with_entities(func.jsonb_object_keys(raw)).distinct().all()
+        ]
+        system_cols = [getattr(model, col) for col in self.SYSTEM_COLUMNS if hasattr(model, col)]
+        field_cols = [
+            raw[key].astext.label(key) for key in sorted(keys)
+            if key not in self.SYSTEM_COLUMNS
+        ]
+        
+        df = self._read_query_df(query.with_entities(*system_cols, *field_cols))
+        print(f"[DATA_FLATTEN] Loaded {len(field_cols)} fields from raw_data")
+        
+        return self._parse_flat_columns(df)
+
+    def _read_query_df(self, query) -> pd.DataFrame:
+        """
+        Load an ORM query into a DataFrame.
+        
+        On PostgreSQL the result is streamed server-side with
+        COPY (...) TO STDOUT and parsed by PyArrow's multithreaded CSV reader,
+        instead of unpacking DBAPI rows one by one as read_sql does. Other
+        dialects fall back to read_sql.
+        """
+        bind = self.db.get_bind()
+        statement = query.statement
+        if bind.dialect.name != 'postgresql':
+            return pd.read_sql(statement, bind)
+        
+        # COPY takes no bind parameters: let psycopg2 render them into the
+        # statement (expanded IN lists included) with its own escaping
+        compiled = statement.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+        buffer = io.BytesIO()
+        # Use RAW psycopg2 cursor for COPY
+        cursor = self.db.connection().connection.cursor()
+        try:
+            sql = cursor.mogrify(str(compiled), compiled.params).decode(cursor.connection.encoding)
+            cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+        finally:
+            cursor.close()
+        buffer.seek(0)
+        
+        # Read every column as text so IDs keep their exact string form,
+        # then restore datetime, JSON and UUID columns from the statement's types.
+        # COPY writes NULL as an empty field and '' as "", so only unquoted
+        # empties become null. Text values (e.g. narratives) may contain
+        # newlines inside quotes, which the block chunker must respect
+        columns = list(statement.selected_columns)
+        table = pacsv.read_csv(
+            buffer,
+            parse_options=pacsv.ParseOptions(newlines_in_values=True),
+            convert_options=pacsv.ConvertOptions(
+                column_types={col.name: pa.string() for col in columns},
+                strings_can_be_null=True,
+                quoted_strings_can_be_null=False,
+            ),
+        )
+        df = table.to_pandas()
+        for col in columns:
+            if isinstance(col.type, DateTime):
+                df[col.name] = pd.to_datetime(df[col.name], utc=True)
+            elif isinstance(col.type, JSON):
+                df[col.name] = df[col.name].map(json.loads, na_action='ignore')
+            elif isinstance(col.type, Uuid) and col.type.as_uuid:
+                df[col.name] = df[col.name].map(uuid.UUID, na_action='ignore')
+        return df
+
+    def _copy_insert(self, model, mappings: List[Dict]):
+        """
+        Insert mappings into model's table.
+        
+        On PostgreSQL the rows are streamed with a single COPY ... FROM STDIN
+        (JSON columns serialized with orjson); other dialects use an ORM bulk
+        INSERT (batched via insertmanyvalues).
+        COPY bypasses the ORM, so Python-side column defaults are applied here.
+        """
+        if not mappings:
+            return
+        bind = self.db.get_bind()
+        if bind.dialect.name != 'postgresql':
+            self.db.execute(insert(model), mappings)
+            return
+        
+        keys = set(mappings[0])
+        columns = [
+            col for col in model.__table__.columns
+            if col.key in keys or (col.default is not None and (col.default.is_scalar or col.default.is_callable))
+        ]
+        
+        def cell(col, mapping):
+            if col.key not in mapping:
+                value = col.default.arg(None) if col.default.is_callable else col.default.arg
+            else:
+                value = mapping[col.key]
+            if value is None:
+                return r'\N'  # NULL marker, so empty strings stay empty strings
+            if isinstance(col.type, JSON):
+                return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY, default=str).decode()
+            return value
+        
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            [cell(col, mapping) for col in columns] for mapping in mappings
+        )
+        buffer.seek(0)
+        
+        column_list = ", ".join(col.name for col in columns)
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {model.__tablename__} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+        finally:
+            cursor.close()
+
     def load_simulation_data(self, user_id: str):
         """
         Load transaction and customer data for a specific user.
@@ -145,12 +296,9 @@ class SimulationService:
         customers_query = self.db.query(Customer).join(DataUpload).filter(DataUpload.user_id == user_id)
         transactions_query = self.db.query(Transaction).join(DataUpload).filter(DataUpload.user_id == user_id)
         
-        customers_df = pd.read_sql(customers_query.statement, self.db.bind)
-        transactions_df = pd.read_sql(transactions_query.statement, self.db.bind)
-        
-        # Flatten raw_data for both
-        customers_df = self._flatten_raw_data(customers_df)
-        transactions_df = self._flatten_raw_data(transactions_df)
+        # Load with raw_data flattened for both
+        customers_df = self._load_flat_df(customers_query, Customer)
+        transactions_df = self._load_flat_df(transactions_query, Transaction)
         
         return customers_df, transactions_df
 
@@ -272,16 +420,14 @@ class SimulationService:
             DataUpload.user_id == user_id,
             Customer.customer_id.in_(customer_ids)
         )
-        customers_df = pd.read_sql(customers_query.statement, self.db.bind)
-        customers_df = self._flatten_raw_data(customers_df)
+        customers_df = self._load_flat_df(customers_query, Customer)
         
         # Load Transactions
         transactions_query = self.db.query(Transaction).join(DataUpload).filter(
             DataUpload.user_id == user_id,
             Transaction.customer_id.in_(customer_ids)
         )
-        transactions_df = pd.read_sql(transactions_query.statement, self.db.bind)
-        transactions_df = self._flatten_raw_data(transactions_df)
+        transactions_df = self._load_flat_df(transactions_query, Transaction)
         
         return customers_df, transactions_df
 
@@ -312,77 +458,47 @@ class SimulationService:
         if transactions_df.empty:
             return
 
-        # Initialize Engine
-        engine = UniversalScenarioEngine(db_session=self.db)
-        all_alerts = []
-        scenarios_to_run = run.scenarios_run or []
+        # Resolve scenario configs up front on the request session
+        scenarios = self._load_scenarios(run.scenarios_run or [])
         
-        # Execute Each Scenario
-        for scenario_id in scenarios_to_run:
-            config_record = self.db.query(ScenarioConfig).filter(ScenarioConfig.scenario_id == scenario_id).first()
-            
-            if not config_record:
-                print(f"[ERROR] Scenario {scenario_id} not found in database!")
-                continue
-            
-            if not config_record.config_json:
-                print(f"[ERROR] Scenario {scenario_id} has no config_json!")
-                continue
-            
-            try:
-
-                
-                conf_data = config_record.config_json.copy()
-                conf_data['scenario_id'] = scenario_id
-                conf_data['scenario_name'] = config_record.scenario_name
-                
-                # Check if aggregation exists
-                if 'aggregation' not in conf_data:
-                    # Valid error check, but removing noisy debug label
-                    print(f"[ERROR] No 'aggregation' key in config_json for {scenario_id}!")
-                    continue
-                
-                if 'threshold' not in conf_data:
-                    print(f"[WARN] No 'threshold' key in config_json for {scenario_id}")
-                
-                scenario_config = ScenarioConfigModel(**conf_data)
-                
-                # Apply Scenario-Specific Mappings
-                current_txns = transactions_df.copy()
-                current_cust = customers_df.copy()
-                
-                if config_record.field_mappings:
-                    current_txns = apply_field_mappings_to_df(current_txns, config_record.field_mappings)
-                    current_cust = apply_field_mappings_to_df(current_cust, config_record.field_mappings)
-
-                # Run Engine
-                alerts = engine.execute(scenario_config, current_txns, current_cust, run_id)
-                all_alerts.extend(alerts)
-                
-            except Exception as e:
-                print(f"[ERROR] Failed to execute scenario {scenario_id}: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
-
-        # Deduplicate Alerts
-        seen_keys = set()
-        deduplicated_alerts = []
+        # Execute Each Scenario. Scenarios are independent and mostly pandas
+        # work, so they run concurrently on a thread pool; results are collected
+        # in scenario order. SQLite connections can't be shared across threads,
+        # so SQLite binds run them one after another.
+        workers = min(len(scenarios), SCENARIO_WORKERS)
+        if self.db.get_bind().dialect.name == 'sqlite':
+            workers = min(workers, 1)
         
-        for alert in all_alerts:
-            # Convert Series to dict if needed
-            if isinstance(alert, pd.Series):
-                alert = alert.to_dict()
-            
-            a_date = alert.get('alert_date', pd.Timestamp.utcnow())
-            if isinstance(a_date, datetime):
-                a_date = a_date.date()
-            
-            key = (str(alert.get('customer_id')), str(a_date), str(alert.get('scenario_id')))
-            
-            if key not in seen_keys:
-                seen_keys.add(key)
-                deduplicated_alerts.append(alert)
+        all_alerts = []
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scenario") as pool:
+                results = pool.map(
+                    lambda scenario: self._run_scenario(*scenario, transactions_df, customers_df, run_id, threaded=True),
+                    scenarios,
+                )
+                for alerts in results:
+                    all_alerts.extend(alerts)
+        else:
+            for scenario in scenarios:
+                all_alerts.extend(self._run_scenario(*scenario, transactions_df, customers_df, run_id))
+
+        # Deduplicate Alerts on (customer, alert day, scenario), keeping the first.
+        # The key columns are built once and deduplicated by pandas. Datetimes
+        # key on .date() in their own timezone; anything else (including date
+        # strings) is compared as text, unparsed.
+        # Convert Series to dict if needed
+        all_alerts = [alert.to_dict() if isinstance(alert, pd.Series) else alert for alert in all_alerts]
+        now = pd.Timestamp.utcnow()
+        alert_dates = [alert.get('alert_date', now) for alert in all_alerts]
+        keys = pd.DataFrame({
+            'customer_id': [str(alert.get('customer_id')) for alert in all_alerts],
+            'alert_day': [str(d.date()) if isinstance(d, datetime) else str(d) for d in alert_dates],
+            'scenario_id': [str(alert.get('scenario_id')) for alert in all_alerts],
+        })
+        deduplicated_alerts = [
+            alert for alert, is_duplicate in zip(all_alerts, keys.duplicated(keep='first').tolist())
+            if not is_duplicate
+        ]
                 
         # Persist Results via Bulk Operations
         alert_mappings = []
@@ -401,17 +517,22 @@ class SimulationService:
 
         from models import AlertTransaction
 
-        for alert_data in deduplicated_alerts:
+        # ✅ EXTRACT SCALAR VALUES (handle Series)
+        def extract_value(data, key, default=None):
+            val = data.get(key, default)
+            if isinstance(val, pd.Series):
+                return val.iloc[0] if len(val) > 0 else default
+            return val
+        
+        # Determine risk classification for all alerts in one vectorized pass
+        risk_scores = [extract_value(alert_data, 'risk_score', 0) for alert_data in deduplicated_alerts]
+        scores = pd.to_numeric(pd.Series(risk_scores, dtype=object), errors='coerce').to_numpy(dtype=float)
+        risk_classes = np.select([scores >= 70, scores >= 40], ['HIGH', 'MEDIUM'], default='LOW').tolist()
+
+        for alert_data, risk_score, risk_classification in zip(deduplicated_alerts, risk_scores, risk_classes):
             is_excluded = alert_data.get('excluded', False)
             alert_id = alert_data.get('alert_id') or str(uuid.uuid4())
             
-            # ✅ EXTRACT SCALAR VALUES (handle Series)
-            def extract_value(data, key, default=None):
-                val = data.get(key, default)
-                if isinstance(val, pd.Series):
-                    return val.iloc[0] if len(val) > 0 else default
-                return val
-            
             # ✅ Extract customer_id with fallback to lookup from transactions
             customer_id = extract_value(alert_data, 'customer_id')
             
@@ -430,12 +551,6 @@ class SimulationService:
             scenario_id = extract_value(alert_data, 'scenario_id')
             scenario_name = extract_value(alert_data, 'scenario_name')
             alert_date = extract_value(alert_data, 'alert_date', pd.Timestamp.utcnow())
-            risk_score = extract_value(alert_data, 'risk_score', 0)
-            
-            # Determine risk classification
-            if risk_score >= 70: risk_classification = 'HIGH'
-            elif risk_score >= 40: risk_classification = 'MEDIUM'
-            else: risk_classification = 'LOW'
             
             # Prepare Alert Mapping
             alert_mappings.append({
@@ -482,7 +597,6 @@ class SimulationService:
             # Prepared Exclusion Log Mapping
             if is_excluded:
                 exclusion_mappings.append({
-                    "log_id": str(uuid.uuid4()), 
                     "alert_id": alert_id,
                     "exclusion_reason": alert_data.get('exclusion_reason', 'Unknown'),
                     "rule_id": "Refinement",
@@ -500,16 +614,96 @@ class SimulationService:
                 print(f"  customer_id: '{sample_alert.get('customer_id')}'")
                 print(f"  trigger_details: {sample_alert.get('trigger_details', {})}")
             
-            self.db.bulk_insert_mappings(Alert, alert_mappings)
+            self._copy_insert(Alert, alert_mappings)
         
         if trace_mappings:
-            self.db.bulk_insert_mappings(AlertTransaction, trace_mappings)
+            self._copy_insert(AlertTransaction, trace_mappings)
             
         if exclusion_mappings:
-            self.db.bulk_insert_mappings(AlertExclusionLog, exclusion_mappings)
+            self._copy_insert(AlertExclusionLog, exclusion_mappings)
 
         self.db.commit()
 
+    def _load_scenarios(self, scenario_ids: List[str]) -> List[tuple]:
+        """
+        Load and validate the configs of the scenarios to run.
+        
+        Returns (scenario_id, ScenarioConfigModel, field_mappings) per runnable
+        scenario, in run order; scenarios that are missing or invalid are
+        logged and skipped.
+        """
+        scenarios = []
+        for scenario_id in scenario_ids:
+            config_record = self.db.query(ScenarioConfig).filter(ScenarioConfig.scenario_id == scenario_id).first()
+            
+            if not config_record:
+                print(f"[ERROR] Scenario {scenario_id} not found in database!")
+                continue
+            
+            if not config_record.config_json:
+                print(f"[ERROR] Scenario {scenario_id} has no config_json!")
+                continue
+            
+            try:
+                conf_data = config_record.config_json.copy()
+                conf_data['scenario_id'] = scenario_id
+                conf_data['scenario_name'] = config_record.scenario_name
+                
+                # Check if aggregation exists
+                if 'aggregation' not in conf_data:
+                    # Valid error check, but removing noisy debug label
+                    print(f"[ERROR] No 'aggregation' key in config_json for {scenario_id}!")
+                    continue
+                
+                if 'threshold' not in conf_data:
+                    print(f"[WARN] No 'threshold' key in config_json for {scenario_id}")
+                
+                scenarios.append((scenario_id, ScenarioConfigModel(**conf_data), config_record.field_mappings))
+                
+            except Exception as e:
+                print(f"[ERROR] Failed to execute scenario {scenario_id}: {e}")
+                import traceback
+                traceback.print_exc()
+                continue
+        
+        return scenarios
+
+    def _run_scenario(self, scenario_id: str, scenario_config: ScenarioConfigModel, field_mappings: Optional[Dict],
+                      transactions_df: pd.DataFrame, customers_df: pd.DataFrame, run_id: str,
+                      threaded: bool = False) -> List[Dict]:
+        """
+        Execute one scenario against the batch and return its alerts.
+        
+        A threaded call gets its own Session on the same bind for the smart
+        layer, since Sessions must not be shared across threads. Failures are
+        logged and yield no alerts, so one bad scenario doesn't stop the run.
+        """
+        session = Session(self.db.get_bind()) if threaded else self.db
+        try:
+            engine = UniversalScenarioEngine(db_session=session)
+            
+            # Apply Scenario-Specific Mappings. The engine treats its inputs as
+            # read-only (it works on the merged frame), so scenarios share the
+            # batch frames and only a mapping creates renamed views of them.
+            current_txns = transactions_df
+            current_cust = customers_df
+            
+            if field_mappings:
+                current_txns = apply_field_mappings_to_df(current_txns, field_mappings)
+                current_cust = apply_field_mappings_to_df(current_cust, field_mappings)
+
+            # Run Engine
+            return engine.execute(scenario_config, current_txns, current_cust, run_id)
+            
+        except Exception as e:
+            print(f"[ERROR] Failed to execute scenario {scenario_id}: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+        finally:
+            if threaded:
+                session.close()
+
     def _execute_single_scenario(self, scenario_config: dict, customer_ids: List[str], upload_id: str, run_id: str, user_id: str):
         """
         Execute a single scenario for a sample of customers.
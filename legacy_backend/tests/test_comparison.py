@@ -0,0 +1,65 @@
+"""
+Tests for run comparison
+"""
+import uuid
+from datetime import datetime, timezone
+
+from models import Alert, AlertTransaction, Transaction
+from services.comparison_service import ComparisonEngine
+
+
+def _alert(alert_id, run_id, customer_id, scenario_id, risk_score=None):
+    return Alert(
+        alert_id=alert_id,
+        run_id=run_id,
+        customer_id=customer_id,
+        scenario_id=scenario_id,
+        risk_score=risk_score,
+        alert_date=datetime(2024, 1, 15, tzinfo=timezone.utc),
+    )
+
+
+def test_granular_diff_aggregates_removed_customers(test_db):
+    """Test removed customers are aggregated in SQL and ordered by risk"""
+    upload_id = uuid.uuid4()
+    test_db.add_all([
+        Transaction(transaction_id="T1", customer_id="C1", upload_id=upload_id, raw_data={"transaction_amount": "1000.50"}),
+        Transaction(transaction_id="T2", customer_id="C1", upload_id=upload_id, raw_data={"transaction_amount": 250}),
+        Transaction(transaction_id="T3", customer_id="C2", upload_id=upload_id, raw_data={"transaction_amount": "n/a"}),
+        _alert("A1", "base", "C1", "S1", risk_score=40),
+        _alert("A2", "base", "C1", "S2"),
+        _alert("A3", "base", "C2", "S1", risk_score=90),
+        _alert("A4", "base", "C3", "S1", risk_score=99),
+        _alert("A5", "refined", "C3", "S1", risk_score=99),
+        AlertTransaction(alert_id="A1", transaction_id="T1", upload_id=upload_id),
+        AlertTransaction(alert_id="A2", transaction_id="T2", upload_id=upload_id),
+        AlertTransaction(alert_id="A3", transaction_id="T3", upload_id=upload_id),
+    ])
+    test_db.commit()
+    engine = ComparisonEngine(test_db)
+
+    diff = engine._calculate_granular_diff("base", "refined")
+
+    assert [row["customer_id"] for row in diff] == ["C2", "C1"]
+    assert diff[1]["alert_count"] == 2
+    assert diff[1]["total_amount"] == 1250.5
+    assert diff[1]["max_risk_score"] == 50
+    assert sorted(diff[1]["scenarios"]) == ["S1", "S2"]
+    assert diff[0]["total_amount"] == 0
+    assert engine._count_alerts("base", "refined") == {"base": 4, "refined": 1}
+
+
+def test_granular_diff_counts_each_alert_transaction_once(test_db):
+    """Test a transaction_id reused by another upload doesn't inflate the amount"""
+    upload_id, other_upload_id = uuid.uuid4(), uuid.uuid4()
+    test_db.add_all([
+        Transaction(transaction_id="T1", customer_id="C1", upload_id=upload_id, raw_data={"transaction_amount": "100"}),
+        Transaction(transaction_id="T1", customer_id="C9", upload_id=other_upload_id, raw_data={"transaction_amount": "999"}),
+        _alert("A1", "base", "C1", "S1", risk_score=40),
+        AlertTransaction(alert_id="A1", transaction_id="T1", upload_id=upload_id),
+    ])
+    test_db.commit()
+
+    diff = ComparisonEngine(test_db)._calculate_granular_diff("base", "refined")
+
+    assert diff[0]["total_amount"] == 100
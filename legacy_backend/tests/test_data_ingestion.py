@@ -0,0 +1,112 @@
+"""
+Tests for CSV ingestion
+"""
+import services.data_ingestion as data_ingestion
+from services.data_ingestion import DataIngestionService
+
+UPLOAD_ID = "abcdef12-0000-0000-0000-000000000001"
+
+
+def _transactions_csv(rows):
+    return ("Txn ID,Cust ID,Amount,Count,Date,Channel,Note\n" + "\n".join(rows) + "\n").encode()
+
+
+def test_raw_data_values_are_strings():
+    """Test raw_data holds the str() of each value, keeps date text and skips nulls"""
+    content = _transactions_csv([
+        "T1,C1,100,3,2024-01-05,ATM,",
+        "T2,C2,25.5,4,05/01/2024,Branch,hello",
+    ])
+    
+    records, errors, _ = DataIngestionService().process_transactions_csv(content, upload_id=UPLOAD_ID)
+    
+    assert errors == []
+    assert records[0] == {
+        "transaction_id": "T1",
+        "customer_id": "abcdef12_C1",
+        "upload_id": UPLOAD_ID,
+        "raw_data": {
+            "amount": "100.0",  # float column, as str(float) like the old float() + str
+            "count": "3",
+            "date": "2024-01-05",
+            "channel": "ATM",
+            "original_customer_id": "C1",
+            "original_transaction_id": "T1",
+        },
+    }
+    assert records[1]["raw_data"]["amount"] == "25.5"
+    assert records[1]["raw_data"]["date"] == "05/01/2024"
+    assert records[1]["raw_data"]["note"] == "hello"
+
+
+def test_missing_ids_report_absolute_rows_across_chunks(monkeypatch):
+    """Test rows missing an ID are reported with file row numbers in every chunk"""
+    monkeypatch.setattr(data_ingestion, "INGEST_CHUNK_ROWS", 3)
+    rows = [f"T{i},C{i},{i}.5,{i},2024-01-05,ATM,n" for i in range(10)]
+    rows[1] = "T1,,1.5,1,2024-01-05,ATM,n"
+    rows[4] = ",C4,4.5,4,2024-01-05,ATM,n"
+    rows[8] = "T8,,8.5,8,2024-01-05,ATM,n"
+    
+    records, errors, _ = DataIngestionService().process_transactions_csv(_transactions_csv(rows), upload_id=UPLOAD_ID)
+    
+    # Header is line 1, so data row i is line i + 2
+    assert [error["row"] for error in errors] == [3, 6, 10]
+    assert [record["transaction_id"] for record in records] == ["T0", "T2", "T3", "T5", "T6", "T7", "T9"]
+
+
+def test_customers_missing_id_and_raw_data(monkeypatch):
+    """Test customer ingestion across chunks: missing IDs, prefixed keys and raw_data strings"""
+    monkeypatch.setattr(data_ingestion, "INGEST_CHUNK_ROWS", 2)
+    content = b"Customer ID,Name,Balance\nC1,Ann,10\n,Bob,20\nC3,Cy,\n"
+    
+    records, errors, _, accounts = DataIngestionService().process_customers_csv(content, upload_id=UPLOAD_ID)
+    
+    assert errors == [{"row": 3, "error": "Missing customer_id"}]
+    assert [record["customer_id"] for record in records] == ["abcdef12_C1", "abcdef12_C3"]
+    assert records[0]["raw_data"] == {"name": "Ann", "balance": "10.0", "original_customer_id": "C1"}
+    assert records[1]["raw_data"] == {"name": "Cy", "original_customer_id": "C3"}
+    assert [account["customer_id"] for account in accounts] == ["abcdef12_C1", "abcdef12_C3"]
+
+
+def test_field_index_counts_and_types_across_chunks(monkeypatch):
+    """Test the field index aggregates value counts over chunks and infers field types"""
+    monkeypatch.setattr(data_ingestion, "INGEST_CHUNK_ROWS", 2)
+    content = _transactions_csv([
+        "T1,C1,10,1,2024-01-05,ATM,",
+        "T2,C1,20,2,2024-01-06,ATM,x",
+        "T3,C2,10,3,2024-01-05,Branch,",
+        ",C9,99,9,2024-01-09,Online,dropped",
+        "T5,C2,10,5,2024-01-05,ATM,",
+    ])
+    
+    records, errors, index = DataIngestionService().process_transactions_csv(content, upload_id=UPLOAD_ID)
+    
+    assert len(records) == 4 and len(errors) == 1
+    
+    channel = index["channel"]
+    assert channel["metadata"]["field_type"] == "text"
+    assert channel["metadata"]["total_records"] == 4
+    assert channel["metadata"]["distinct_count"] == 2
+    assert {v["field_value"]: v["value_count"] for v in channel["values"]} == {"ATM": 3, "Branch": 1}
+    assert {v["field_value"]: v["value_percentage"] for v in channel["values"]} == {"ATM": 75.0, "Branch": 25.0}
+    
+    assert index["amount"]["metadata"]["field_type"] == "numeric"
+    assert index["date"]["metadata"]["field_type"] == "date"
+    # Only the kept row with a note counts; rows from dropped records do not
+    assert index["note"]["metadata"]["non_null_count"] == 1
+    assert index["note"]["metadata"]["null_count"] == 3
+    assert {v["field_value"]: v["value_count"] for v in index["original_customer_id"]["values"]} == {"C1": 2, "C2": 2}
+
+
+def test_multiline_cells_across_parse_blocks(monkeypatch):
+    """Test quoted cells spanning lines parse when the file spans several blocks"""
+    monkeypatch.setattr(data_ingestion, "INGEST_BLOCK_BYTES", 4096)
+    rows = [f'T{i},C{i % 7},{i}.50,"line one {i}\nline two {i}"' for i in range(2000)]
+    content = ("transaction_id,customer_id,amount,narrative\n" + "\n".join(rows) + "\n").encode()
+    
+    records, errors, _ = DataIngestionService().process_transactions_csv(content, upload_id=UPLOAD_ID)
+    
+    assert errors == []
+    assert len(records) == 2000
+    assert records[1234]["transaction_id"] == "T1234"
+    assert records[1234]["raw_data"]["narrative"] == "line one 1234\nline two 1234"
@@ -0,0 +1,78 @@
+"""
+Tests for smart layer refinements
+"""
+import uuid
+
+import pandas as pd
+from sqlalchemy import insert, select
+
+from core.smart_layer import SmartLayerProcessor
+from models import AlertExclusionLog, VerifiedEntity
+
+
+def _transactions():
+    return pd.DataFrame({
+        "transaction_id": ["T1", "T2", "T3", "T4"],
+        "customer_id": ["C1", "C1", "C2", "C3"],
+        "transaction_date": pd.to_datetime(["2024-01-10", "2024-01-12", "2024-01-12", "2023-10-01"]),
+        "transaction_amount": [1000.0, 2000.0, 500.0, 700.0],
+        "transaction_narrative": ["Grocery", "Home loan EMI", "Card payment", "Mortgage repayment"],
+        "beneficiary_name": ["Shop", "HDFC", "Store", "HDFC"],
+    })
+
+
+def test_event_refinement_excludes_alerts_in_trigger_window(test_db):
+    """Test that loan activity inside the lookback window excludes the alert"""
+    alerts = pd.DataFrame({
+        "customer_id": ["C1", "C2", "C3"],
+        "alert_date": pd.to_datetime(["2024-01-15", "2024-01-15", "2024-01-15"]),
+        "aggregated_value": [3000.0, 500.0, 700.0],
+    })
+    processor = SmartLayerProcessor(test_db)
+
+    result = processor.apply_refinements(
+        alerts, _transactions(), [{"type": "event_based", "excluded_events": ["loan"]}]
+    )
+
+    # C1 has a loan in the window; C3's loan is older than 30 days
+    assert result["excluded"].tolist() == [True, False, False]
+    assert result.loc[0, "exclusion_reason"] == "Legitimate loan transaction"
+
+
+def test_detect_event_types_matches_keyword_precedence(test_db):
+    """Test vectorized event detection follows detect_event_context"""
+    detector = SmartLayerProcessor(test_db).event_detector
+    narratives = pd.Series(["University loan", "FD maturity", None, "Groceries"])
+
+    assert detector.detect_event_types(narratives).tolist() == ["education", "fixed_deposit", None, None]
+    assert detector.detect_event_context("Loan for university fees", 1000.0, "Uni")["type"] == "education"
+    assert detector.detect_event_context("Term deposit after home loan", 1000.0, "Bank")["type"] == "loan"
+    assert detector.detect_event_context("Groceries", 1000.0, "Shop") is None
+
+
+def test_verified_entity_lookup_uses_preloaded_whitelist(test_db):
+    """Test whitelist matching mirrors ILIKE '%name%' and is loaded once"""
+    test_db.add(VerifiedEntity(entity_name="Massachusetts Institute of Technology", entity_type="University"))
+    test_db.add(VerifiedEntity(entity_name="Old College", entity_type="University", is_active=False))
+    test_db.commit()
+    detector = SmartLayerProcessor(test_db).event_detector
+
+    assert detector.is_verified_entity("institute of tech", "University")
+    assert not detector.is_verified_entity("Old College", "University")
+    assert not detector.is_verified_entity("institute of tech", "FinancialInstitution")
+
+    # Entities added after the first lookup are not re-queried mid-pass
+    test_db.add(VerifiedEntity(entity_name="Late Academy", entity_type="University"))
+    test_db.commit()
+    assert not detector.is_verified_entity("Late Academy", "University")
+
+
+def test_exclusion_log_key_defaults_to_dashed_uuid(test_db):
+    """Test server-generated log keys use the same text form as PostgreSQL's gen_random_uuid()"""
+    test_db.execute(insert(AlertExclusionLog), [{"alert_id": "A1"}, {"alert_id": "A2"}])
+    log_ids = test_db.execute(select(AlertExclusionLog.log_id)).scalars().all()
+    
+    assert len(set(log_ids)) == 2
+    for log_id in log_ids:
+        assert str(uuid.UUID(log_id)) == log_id
+        assert uuid.UUID(log_id).version == 4
@@ -0,0 +1,59 @@
+"""
+Tests for the universal scenario engine processors
+"""
+import pandas as pd
+
+from core.config_models import AlertCondition, AmountRange, ScenarioConfigModel, ScenarioFilters
+from core.universal_engine import AlertConditionEvaluator, UniversalScenarioEngine
+
+
+def test_trivial_condition_uses_vector_comparison():
+    """Test that plain threshold comparisons are evaluated without simpleeval"""
+    data = pd.DataFrame({
+        "customer_id": ["C1", "C2", "C3"],
+        "aggregated_value": [100.0, 50.0, 75.0],
+        "threshold": [75.0, 75.0, 75.0],
+    })
+    evaluator = AlertConditionEvaluator()
+
+    gt = evaluator.evaluate_condition(data, AlertCondition(expression="aggregated_value > threshold"))
+    assert gt["customer_id"].tolist() == ["C1"]
+
+    ge = evaluator.evaluate_condition(data, AlertCondition(expression="aggregated_value  >=  threshold"))
+    assert ge["customer_id"].tolist() == ["C1", "C3"]
+
+
+def test_custom_condition_falls_back_to_evaluator():
+    """Test that non-trivial expressions are still evaluated per row"""
+    data = pd.DataFrame({
+        "customer_id": ["C1", "C2"],
+        "aggregated_value": [100.0, 300.0],
+        "threshold": [75.0, 75.0],
+    })
+    evaluator = AlertConditionEvaluator()
+
+    alerts = evaluator.evaluate_condition(data, AlertCondition(expression="aggregated_value > threshold * 2"))
+    assert alerts["customer_id"].tolist() == ["C2"]
+
+
+def test_compile_caches_by_scenario_and_config():
+    """Test that compiled scenarios are reused until the config changes"""
+    engine = UniversalScenarioEngine()
+    config = ScenarioConfigModel(
+        scenario_id="TEST_COMPILE",
+        scenario_name="Compile Test",
+        filters=ScenarioFilters(direction="debit", amount_range=AmountRange(min=100)),
+    )
+
+    compiled = engine.compile(config)
+    assert engine.compile(config.model_copy()) is compiled
+    assert len(compiled.filter_ops) == 2
+
+    txns = pd.DataFrame({
+        "debit_credit_indicator": ["D", "C", "D"],
+        "transaction_amount": [500.0, 500.0, 50.0],
+    })
+    assert len(engine.filter_processor.run_filters(txns, compiled.filter_ops)) == 1
+
+    changed = config.model_copy(update={"filters": ScenarioFilters(direction="credit")})
+    assert engine.compile(changed) is not compiled